@@ -8,10 +8,9 @@
 # In[2]:
 
 
-import pandas as pd
-import numpy as np
+from listings_loader import load_listings
 
-df = pd.read_csv('AB_NYC_2019.csv')
+df = load_listings('AB_NYC_2019.csv')
 
 
 # ## Data Cleaning/Loading
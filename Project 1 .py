@@ -33,26 +33,32 @@
 # In[54]:
 
 
-#Import libraries
-from mpl_toolkits.mplot3d import Axes3D
-from sklearn.preprocessing import StandardScaler
-import matplotlib
-import matplotlib.colors as mplc
-import matplotlib.patches as patches
+#Import libraries (for scheduled runs use `python report.py --headless`, which loads plotting libraries only when drawing)
 import matplotlib.pyplot as plt 
-import plotly.express as px
 import seaborn as sns
 import numpy as np 
-import os 
 import pandas as pd 
+from agg_cube import cached_cube
+from binning import Histogram, data_bin_edges, kde_grid, plot_histogram, plot_violins, scott_bandwidth
+from bootstrap_ci import cached_mean_ci, plot_mean_ci
+from heavy_hitters import cached_top_k
+from outliers import fences_from_sketches, find_outliers
+from quantile_sketch import cached_sketches
+from raster import raster_figure, rasterize, stratified_sample
+from summary_stats import summarize
+from vocabulary import Vocabulary, drop_unused_labels, load_encoded
 
 
 # In[55]:
 
 
-#Load Dataset 
-df = pd.read_csv('AB_NYC_2019.csv', delimiter=',')
+#Load Dataset (typed schema; warm runs read the columnar cache instead of the CSV)
+#String columns are categoricals whose codes come from the saved vocabulary, so they stay the same across snapshots
+vocab = Vocabulary.load(Vocabulary.default_path('AB_NYC_2019.csv'))
+df = load_encoded('AB_NYC_2019.csv', vocabulary=vocab, verbose=True)
 df.dataframeName = 'AB_NYC_2019.csv'
+#Plots draw a slot per category, so they use the columns without labels that only other cities have
+plot_df = drop_unused_labels(df[['neighbourhood_group', 'room_type', 'price']])
 
 
 # In[4]:
@@ -79,11 +85,14 @@ dtypes_df
 # In[8]:
 
 
-Q1 = df['price'].quantile(0.25)
-Q3 = df['price'].quantile(0.75)
-IQR = Q3 - Q1
+#Quantile sketches of price and reviews are cached next to the data, so quartiles and the
+#95th percentile used below are read from them instead of re-sorting the columns
+sketches = cached_sketches('AB_NYC_2019.csv', ['price', 'number_of_reviews'], df)
+
+#IQR fences for both columns from the sketches; rows are only pulled out for display
+outliers = find_outliers(df, ['price', 'number_of_reviews'], fences=fences_from_sketches(sketches))
 #price mean = 152.72
-price_outliers = df[(df['price'] < (Q1 - 1.5 * IQR)) | (df['price'] > (Q3 + 1.5 * IQR))]
+price_outliers = outliers.rows(df, 'price')
 price_outliers
 
 
@@ -92,11 +101,7 @@ price_outliers
 # In[9]:
 
 
-Q1 = df['number_of_reviews'].quantile(0.25)
-Q3 = df['number_of_reviews'].quantile(0.75)
-IQR = Q3 - Q1
-
-num_review_outliers = df[(df['number_of_reviews'] < (Q1 - 1.5 * IQR)) | (df['number_of_reviews'] > (Q3 + 1.5 * IQR))]
+num_review_outliers = outliers.rows(df, 'number_of_reviews')
 num_review_outliers
 
 
@@ -144,13 +149,9 @@ df.duplicated().sum()
 
 variables = ['neighbourhood_group', 'neighbourhood', 'room_type', 'number_of_reviews', 'price']
 
-summary_df = pd.DataFrame()
+#One pass over the data; same layout as stacking df[var].describe(include='all') per variable
+summary_df = summarize(df, variables)
 
-for var in variables:
-    description = df[var].describe(include='all').to_frame().transpose()
-    description.index = [var]
-    summary_df = pd.concat([summary_df, description], axis=0)
-    
 summary_df
 
 
@@ -198,10 +199,15 @@ summary_df
 # In[106]:
 
 
+#Counts, sums and quantile sketches per neighbourhood_group x neighbourhood x room_type,
+#cached next to the data; the figures below roll up from it instead of rescanning df
+cube = cached_cube('AB_NYC_2019.csv', df)
+
 sns.set(style="whitegrid")
 
+group_counts = cube.counts('neighbourhood_group')
 fig, ax = plt.subplots(figsize=(10, 6))
-sns.countplot(x='neighbourhood_group', data=df, palette='muted', ax=ax)
+sns.barplot(x=group_counts.index, y=group_counts.values, hue=group_counts.index, legend=False, palette='muted', ax=ax)
 
 ax.set_title('Distribution of Listings Across Neighborhood Groups')
 ax.set_xlabel('Neighborhood Group')
@@ -215,15 +221,12 @@ plt.show()
 # In[249]:
 
 
-counts = df['neighbourhood'].value_counts()
-
-# Keep only the top N categories and group the rest as 'Other'
+# Keep only the top N neighbourhoods and group the rest as 'Other', from cached per-group counts (df is left as is)
 N = 10
-top_n = counts[:N].index
-df['neighbourhood_reduced'] = df['neighbourhood'].where(df['neighbourhood'].isin(top_n), 'Other')
+top_hoods = cached_top_k('AB_NYC_2019.csv', df).top(N, other='Other').sort_values(ascending=False)
 
 plt.figure(figsize=(12, 6))
-sns.countplot(y='neighbourhood_reduced', data=df, order=df['neighbourhood_reduced'].value_counts().index, color='skyblue')
+sns.barplot(x=top_hoods.values, y=top_hoods.index, order=top_hoods.index, color='skyblue')
 
 plt.title('Top 10 Neighborhoods Distribution')
 plt.xlabel('Frequency')
@@ -239,8 +242,9 @@ plt.show()
 
 sns.set(style="whitegrid")
 
+room_counts = cube.counts('room_type')
 fig, ax = plt.subplots(figsize=(10, 6))
-sns.countplot(x='room_type', data=df, palette='muted', ax=ax)
+sns.barplot(x=room_counts.index, y=room_counts.values, hue=room_counts.index, legend=False, palette='muted', ax=ax)
 
 ax.set_title('Distribution of Listings Across Room Types')
 ax.set_xlabel('Room Type')
@@ -256,8 +260,12 @@ plt.show()
 
 sns.set(style="whitegrid")
 
+#Bins as wide as 50 bins over the full data range, but only those below the x-axis limit are filled;
+#the plot is drawn from the bin counts
+review_hist = Histogram(data_bin_edges(*summary_df.loc['number_of_reviews', ['min', 'max']], 50, hi=300)).update(df['number_of_reviews'])
+
 plt.figure(figsize=(10, 6))
-sns.histplot(df['number_of_reviews'], bins=50, kde=False, color='skyblue')
+plot_histogram(plt.gca(), review_hist, color='skyblue')
 
 plt.title('Distribution of Number of Reviews')
 plt.xlabel('Number of Reviews')
@@ -274,8 +282,11 @@ plt.show()
 
 sns.set(style="whitegrid")
 
+#Bins as wide as 100 bins over the full data range, as above
+price_hist = Histogram(data_bin_edges(*summary_df.loc['price', ['min', 'max']], 100, hi=1500)).update(df['price'])
+
 plt.figure(figsize=(10, 6))
-sns.histplot(df['price'], bins=100, kde=False, color='skyblue')
+plot_histogram(plt.gca(), price_hist, color='skyblue')
 
 plt.title('Distribution of Airbnb Listing Price')
 plt.xlabel('Price (in dollars)')
@@ -291,7 +302,7 @@ plt.show()
 
 
 plt.figure(figsize=(12, 6))
-sns.boxplot(x='neighbourhood_group', y='price', data=df)
+sns.boxplot(x='neighbourhood_group', y='price', data=plot_df)
 
 plt.title('Price Distribution Across Neighborhood Groups (Unfiltered)')
 plt.xlabel('Neighbourhood Group')
@@ -303,8 +314,8 @@ plt.show()
 # In[105]:
 
 
-upper_limit = df['price'].quantile(0.95)
-filtered_df = df[df['price'] <= upper_limit]
+upper_limit = sketches['price'].quantile(0.95)
+filtered_df = plot_df[plot_df['price'] <= upper_limit]
 
 plt.figure(figsize=(12, 6))
 sns.boxplot(x='neighbourhood_group', y='price', data=filtered_df)
@@ -320,9 +331,7 @@ plt.show()
 # In[21]:
 
 
-upper_limit = df['price'].quantile(0.95)
-filtered_df = df[df['price'] <= upper_limit]
-
+#Same 95th-percentile filter as above
 plt.figure(figsize=(12, 6))
 sns.boxplot(x='room_type', y='price', data=filtered_df)
 
@@ -337,8 +346,11 @@ plt.show()
 # In[94]:
 
 
-fig = px.scatter(df, x='number_of_reviews', y='price', opacity=0.5, size_max=8)
-fig.update_traces(marker=dict(size=7))
+#Points are binned into a 600x400 pixel grid; the figure carries the grid, not every listing
+price_review_raster = rasterize(df['number_of_reviews'], df['price'],
+                                x_range=(0, summary_df.loc['number_of_reviews', 'max']),
+                                y_range=(0, summary_df.loc['price', 'max']))
+fig = raster_figure(price_review_raster)
 
 fig.update_layout(
     xaxis=dict(
@@ -363,10 +375,7 @@ fig.show()
 # In[96]:
 
 
-frac_matrix_norm = (df.groupby(['neighbourhood_group', 'room_type'])
-                    .size()
-                    .unstack()
-                    .div(df.groupby(['neighbourhood_group']).size(), axis=0))
+frac_matrix_norm = cube.fraction_matrix('neighbourhood_group', 'room_type')
 
 frac_matrix_norm.plot(kind='bar', stacked=True, figsize=(10, 6))  
 plt.ylabel('Room Type Fraction')
@@ -380,11 +389,22 @@ plt.title("Fraction of Room Types Across Neighborhood Groups")
 # In[100]:
 
 
-dataset_original = [df[df['room_type']=='Entire home/apt']['number_of_reviews'].values,
-                    df[df['room_type']=='Private room']['number_of_reviews'].values,
-                    df[df['room_type']=='Shared room']['number_of_reviews'].values]
+#One pass bins reviews per room type into unit-wide bins (with headroom above the
+#300 cut-off for the kernel tails); KDEs use Scott's bandwidth from the cube moments
+room_types = ['Entire home/apt', 'Private room', 'Shared room']
+room_codes = vocab['room_type'].recode(df['room_type'].cat.codes, room_types)
+review_bins = Histogram(np.arange(-0.5, 400.5), n_groups=3).update(df['number_of_reviews'], room_codes)
+
+review_stats = cube.rollup('room_type').loc[room_types]
+review_sketches = cube.sketch('room_type', 'number_of_reviews')
+densities = []
+for i, room in enumerate(room_types):
+    bw = scott_bandwidth(review_stats.loc[room, 'count'], review_stats.loc[room, 'number_of_reviews_std'])
+    grid, density = kde_grid(review_bins, bw, group=i)
+    densities.append(density)
 
-plt.violinplot(dataset = dataset_original)
+plot_violins(plt.gca(), grid, densities,
+             extrema=[(review_sketches[r].min, review_sketches[r].max) for r in room_types])
 plt.xticks([1, 2, 3], ['Entire home/apt', 'Private room', 'Shared room'])
 plt.ylabel('Number of Reviews')
 plt.xlabel('Room Type')
@@ -400,8 +420,11 @@ plt.show()
 # In[115]:
 
 
+#At most 300 random listings per neighbourhood group x room type keeps the point count bounded
+strip_sample = stratified_sample(plot_df, ['neighbourhood_group', 'room_type'], n_per_group=300)
+
 fig, ax = plt.subplots(figsize=(9, 5))
-sns.stripplot(x="neighbourhood_group", y="price", hue="room_type", data=df, palette="muted", ax=ax, dodge=True)
+sns.stripplot(x="neighbourhood_group", y="price", hue="room_type", data=strip_sample, palette="muted", ax=ax, dodge=True)
 
 ax.set(title='Prices Distribution by Neighbourhood Group and Room Type (Unadjusted)', xlabel='Neighbourhood Group', ylabel='Price (in dollars)')
 plt.legend(title='Room Type')
@@ -412,8 +435,12 @@ plt.show()
 # In[110]:
 
 
+#Seeded 95% bootstrap intervals (as sns.barplot draws), computed once in batched NumPy and cached
+price_ci = cached_mean_ci('AB_NYC_2019.csv', df, ['neighbourhood_group', 'room_type'], 'price', seed=0)
+
 fig, ax = plt.subplots(figsize=(9, 5))
-sns.barplot(x="neighbourhood_group", y="price", hue="room_type", data=df, palette="muted", ax=ax)
+plot_mean_ci(ax, price_ci, colors=sns.color_palette('muted'))
+ax.legend(title='room_type')
 ax.set(title='Average Price by Neighbourhood Group and Room Type', xlabel='Neighbourhood Group', ylabel='Average Price (in dollars)')
 
 plt.show()
@@ -0,0 +1,170 @@
+"""Aggregation cube over neighbourhood_group x neighbourhood x room_type.
+
+The cube stores, for every observed finest-grain cell, the row count and the
+sum and sum of squares of each measure (price, number_of_reviews), plus a
+QuantileSketch per measure. Any coarser grouping (per neighbourhood_group,
+per room_type, group x room type, ...) is rolled up from those cells instead
+of rescanning the listings frame, and the cube is pickled next to the data
+cache so warm runs do not touch the frame at all.
+
+    cube = cached_cube('AB_NYC_2019.csv', df)
+    cube.counts('room_type')
+    cube.fraction_matrix('neighbourhood_group', 'room_type')
+    cube.mean_ci(['neighbourhood_group', 'room_type'], 'price')
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from listings_loader import cache_path, load_or_build
+from quantile_sketch import QuantileSketch
+
+DIMENSIONS = ['neighbourhood_group', 'neighbourhood', 'room_type']
+MEASURES = ['price', 'number_of_reviews']
+
+# Bump when the pickled layout changes so stale cubes are rebuilt
+CUBE_VERSION = 1
+
+
+def _as_list(dims):
+    return [dims] if isinstance(dims, str) else list(dims)
+
+
+class AggCube:
+
+    def __init__(self, dimensions=DIMENSIONS, measures=MEASURES, compression=500):
+        self.dimensions = list(dimensions)
+        self.measures = list(measures)
+        self.compression = compression
+        cols = ['count'] + [f'{m}_{s}' for m in self.measures for s in ('sum', 'sumsq')]
+        index = pd.MultiIndex.from_tuples([], names=self.dimensions)
+        self.cells = pd.DataFrame(columns=cols, index=index, dtype=float)
+        self.sketches = {}
+
+    def _aggregate(self, chunk):
+        values = chunk[self.measures].astype(float)
+        squares = values ** 2
+        squares.columns = [f'{m}_sumsq' for m in self.measures]
+        values.columns = [f'{m}_sum' for m in self.measures]
+        keys = chunk[self.dimensions].astype(object)
+        frame = pd.concat([keys, values, squares], axis=1)
+        frame['count'] = 1.0
+        grouped = frame.groupby(self.dimensions, sort=False)
+        return grouped.sum()[self.cells.columns], grouped
+
+    def update(self, chunk):
+        """Add the rows of a DataFrame chunk to the cube."""
+        agg, grouped = self._aggregate(chunk)
+        self.cells = self.cells.add(agg, fill_value=0) if len(self.cells) else agg.sort_index()
+
+        values = {m: chunk[m].to_numpy() for m in self.measures}
+        for key, idx in grouped.indices.items():
+            sketches = self.sketches.setdefault(
+                key, {m: QuantileSketch(self.compression) for m in self.measures})
+            for m in self.measures:
+                sketches[m].update(values[m][idx])
+        return self
+
+    def remove(self, chunk):
+        """Take the rows of a chunk that was added before out of the cube.
+
+        Cells left without rows are dropped. Raises ValueError (from
+        QuantileSketch.remove) if a cell sketch has become approximate.
+        """
+        if not len(chunk):
+            return self
+        agg, grouped = self._aggregate(chunk)
+        cells = self.cells.sub(agg, fill_value=0)
+        self.cells = cells[cells['count'] > 0.5]
+        values = {m: chunk[m].to_numpy() for m in self.measures}
+        for key, idx in grouped.indices.items():
+            sketches = self.sketches[key]
+            for m in self.measures:
+                sketches[m].remove(values[m][idx])
+            if not sketches[self.measures[0]].weights.size:
+                del self.sketches[key]
+        return self
+
+    def merge(self, other):
+        """Fold another cube with the same dimensions into this one."""
+        self.cells = self.cells.add(other.cells, fill_value=0) if len(self.cells) else other.cells.copy()
+        for key, sketches in other.sketches.items():
+            mine = self.sketches.setdefault(
+                key, {m: QuantileSketch(self.compression) for m in self.measures})
+            for m in self.measures:
+                mine[m].merge(sketches[m])
+        return self
+
+    def rollup(self, dims=()):
+        """count, sum, mean and std of every measure at the grain of `dims`."""
+        dims = _as_list(dims)
+        cells = self.cells.groupby(dims).sum() if dims else self.cells.sum().to_frame('all').T
+        n = cells['count']
+        out = pd.DataFrame({'count': n.astype('int64')})
+        for m in self.measures:
+            s, ss = cells[f'{m}_sum'], cells[f'{m}_sumsq']
+            var = ((ss - s ** 2 / n) / (n - 1)).clip(lower=0).where(n > 1)
+            out[f'{m}_sum'] = s
+            out[f'{m}_mean'] = s / n
+            out[f'{m}_std'] = np.sqrt(var)
+        return out
+
+    def counts(self, dims):
+        """Number of listings per value of `dims` (what countplot draws)."""
+        return self.rollup(dims)['count'].rename('count')
+
+    def fraction_matrix(self, rows, columns):
+        """Share of each `columns` value within each `rows` value."""
+        counts = self.counts([rows, columns]).unstack(columns)
+        return counts.div(counts.sum(axis=1), axis=0)
+
+    def mean_ci(self, dims, measure='price', level=0.95):
+        """Mean of `measure` per `dims` with a normal-approximation CI."""
+        r = self.rollup(dims)
+        half = NormalDist().inv_cdf(0.5 + level / 2) * r[f'{measure}_std'] / np.sqrt(r['count'])
+        return pd.DataFrame({'mean': r[f'{measure}_mean'],
+                             'lower': r[f'{measure}_mean'] - half,
+                             'upper': r[f'{measure}_mean'] + half,
+                             'count': r['count']})
+
+    def sketch(self, dims, measure='price'):
+        """Merged QuantileSketch per value of `dims`."""
+        dims = _as_list(dims)
+        pos = [self.dimensions.index(d) for d in dims]
+        out = {}
+        for key, sketches in self.sketches.items():
+            sub = tuple(key[p] for p in pos)
+            sub = sub[0] if len(sub) == 1 else sub
+            out.setdefault(sub, QuantileSketch(self.compression)).merge(sketches[measure])
+        return out
+
+    def quantile(self, dims, measure='price', q=0.5):
+        """Quantile(s) of `measure` per value of `dims`, from the cell sketches."""
+        sketches = self.sketch(dims, measure)
+        q_list = np.atleast_1d(q)
+        table = pd.DataFrame({k: s.quantile(q_list) for k, s in sketches.items()}, index=q_list).T
+        table.index.names = _as_list(dims)
+        table = table.sort_index()
+        return table[q_list[0]] if np.ndim(q) == 0 else table
+
+
+def build_cube(data, dimensions=DIMENSIONS, measures=MEASURES):
+    """Build a cube from a DataFrame or an iterable of DataFrame chunks."""
+    cube = AggCube(dimensions, measures)
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+        cube.update(chunk)
+    return cube
+
+
+def cached_cube(path, df=None, cache_dir=None):
+    """The cube for listings file `path`, cached next to the data (built from
+    `df`, or by loading `path`, on a miss)."""
+    def build():
+        frame = df
+        if frame is None:
+            from listings_loader import ANALYSIS_COLUMNS, load_listings
+            frame = load_listings(path, columns=ANALYSIS_COLUMNS, cache_dir=cache_dir)
+        return build_cube(frame)
+    return load_or_build(cache_path(path, '.cube.pkl', cache_dir=cache_dir), CUBE_VERSION, build)
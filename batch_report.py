@@ -0,0 +1,296 @@
+"""Batch build of the Project 1 report as an HTML page with external figures.
+
+Every figure of report.FIGURES is keyed on a digest of its aggregate inputs
+(counts, bins, box statistics, rasters, ...), of its draw function and of the
+plotting library versions. Figures are kept in a content-addressed cache
+(.cache/figures next to the data), so a rebuild only redraws the figures
+whose inputs changed. Redraws are submitted to a process pool as soon as
+their inputs are computed, so drawing overlaps the remaining input steps.
+
+The page (report.html) holds the report tables and references the figures
+as separate files under figures/, named by digest so they can be cached
+forever by a browser or web server. The notebook export instead embeds
+every plot payload in the page. PNGs are quantized to a 256-colour palette
+and optimized when Pillow is installed; --format svg writes vector figures
+instead.
+
+    python batch_report.py AB_NYC_2019.csv --out-dir report --workers 4
+    python batch_report.py AB_NYC_2019.csv --figures price_hist,mean_price --format svg
+
+Helpers called by a draw function (plot_boxes, raster_figure, ...) are not
+part of its digest; bump RENDER_VERSION when they change what is drawn.
+"""
+
+import argparse
+import hashlib
+import html
+import io
+import os
+import shutil
+import sys
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib.metadata import PackageNotFoundError, version
+
+import numpy as np
+import pandas as pd
+
+import report
+from listings_loader import CACHE_DIR
+
+# Bump to invalidate every cached figure
+RENDER_VERSION = 1
+FORMATS = ('png', 'svg')
+DPI = 100
+LIBRARIES = ('matplotlib', 'seaborn', 'plotly', 'pillow')
+
+
+# Digests
+
+def _update(h, obj):
+    """Feed a canonical byte form of `obj` into hash `h`."""
+    h.update(type(obj).__name__.encode())
+    if isinstance(obj, np.ndarray):
+        h.update(f'{obj.dtype}{obj.shape}'.encode())
+        if obj.dtype == object:
+            _update(h, obj.tolist())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, pd.DataFrame):
+        _update(h, obj.index)
+        _update(h, obj.columns)
+        for i in range(obj.shape[1]):
+            _update(h, obj.iloc[:, i].to_numpy())
+    elif isinstance(obj, pd.Series):
+        _update(h, obj.name)
+        _update(h, obj.index)
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, pd.Index):
+        _update(h, list(obj.names))
+        _update(h, obj.to_numpy())
+    elif isinstance(obj, dict):
+        for key in sorted(obj, key=repr):
+            _update(h, key)
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        h.update(str(len(obj)).encode())
+        for item in obj:
+            _update(h, item)
+    elif isinstance(obj, (set, frozenset)):
+        _update(h, sorted(obj, key=repr))
+    elif isinstance(obj, types.CodeType):
+        h.update(obj.co_code)
+        _update(h, obj.co_consts)
+        _update(h, obj.co_names)
+    elif isinstance(obj, types.FunctionType):
+        _update(h, obj.__code__)
+        _update(h, [c.cell_contents for c in obj.__closure__ or ()])
+    elif obj is None or isinstance(obj, (bool, int, float, complex, str, bytes, np.generic)):
+        h.update(repr(obj).encode())
+    elif hasattr(obj, '__dict__'):
+        _update(h, vars(obj))
+    else:
+        raise TypeError(f'cannot digest {type(obj).__name__}')
+
+
+def _library_versions():
+    versions = []
+    for name in LIBRARIES:
+        try:
+            versions.append(version(name))
+        except PackageNotFoundError:
+            versions.append(None)
+    return versions
+
+
+def figure_key(spec, inputs, ext):
+    """Digest of everything that decides how a figure looks."""
+    h = hashlib.blake2b(digest_size=8)
+    _update(h, [RENDER_VERSION, spec.name, spec.kind, ext, DPI, _library_versions()])
+    _update(h, spec.draw)
+    _update(h, inputs)
+    return h.hexdigest()
+
+
+# Drawing (runs in the worker processes)
+
+def compress_png(data):
+    """Palette-quantized, optimized PNG bytes; the input if Pillow is missing or it does not help."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return data
+    out = io.BytesIO()
+    Image.open(io.BytesIO(data)).convert('RGB').quantize(256).save(out, format='PNG', optimize=True)
+    return out.getvalue() if out.tell() < len(data) else data
+
+
+def save_figure(fig, spec, path, ext):
+    """Write a drawn figure to `path` (png, svg, or html for plotly)."""
+    if spec.kind == 'plotly':
+        fig.write_html(path, include_plotlyjs='cdn', full_html=True)
+        return
+    plt, _ = report._pyplot()
+    if ext == 'svg':
+        plt.rcParams['svg.hashsalt'] = spec.name    # stable element ids
+        fig.savefig(path, format='svg', bbox_inches='tight', metadata={'Date': None})
+    else:
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=DPI, bbox_inches='tight')
+        with open(path, 'wb') as f:
+            f.write(compress_png(buf.getvalue()))
+    plt.close(fig)
+
+
+def draw_figure(name, inputs, path, ext):
+    """Draw figure `name` from its inputs into `path`; returns the seconds taken."""
+    start = time.perf_counter()
+    report.set_headless()
+    spec = report.select_figures([name])[0]
+    tmp = f'{path}.tmp.{os.getpid()}'
+    save_figure(spec.draw(inputs), spec, tmp, ext)
+    os.replace(tmp, path)
+    return time.perf_counter() - start
+
+
+# Report
+
+def default_cache_dir(path):
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR, 'figures')
+
+
+def _publish(cached, fig_dir, entry):
+    """Put the cached file into fig_dir, replacing older versions of the figure."""
+    os.makedirs(fig_dir, exist_ok=True)
+    for old in os.listdir(fig_dir):
+        if old.startswith(entry['name'] + '-') and old != entry['file']:
+            os.remove(os.path.join(fig_dir, old))
+    target = os.path.join(fig_dir, entry['file'])
+    if not os.path.exists(target):
+        try:
+            os.link(cached, target)
+        except OSError:
+            shutil.copyfile(cached, target)
+    entry['bytes'] = os.path.getsize(target)
+
+
+def render_figures(data, specs, out_dir, workers=None, fmt='png', cache_dir=None, use_cache=True):
+    """Draw the figures in `specs` that are not cached yet, with `workers`
+    processes (default: all cores), and publish all of them to out_dir/figures.
+    Returns one dict per figure: name, file, kind, cached, inputs_s, draw_s and bytes."""
+    if fmt not in FORMATS:
+        raise ValueError(f'format must be one of {FORMATS}, got {fmt!r}')
+    workers = workers or os.cpu_count()
+    cache_dir = cache_dir or default_cache_dir(data.path)
+    os.makedirs(cache_dir, exist_ok=True)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    entries, pending = [], {}
+    try:
+        for spec in specs:
+            start = time.perf_counter()
+            inputs = spec.inputs(data)
+            ext = 'html' if spec.kind == 'plotly' else fmt
+            name = f'{spec.name}-{figure_key(spec, inputs, ext)}.{ext}'
+            entry = {'name': spec.name, 'file': name, 'kind': spec.kind,
+                     'cached': use_cache and os.path.exists(os.path.join(cache_dir, name)),
+                     'inputs_s': time.perf_counter() - start, 'draw_s': 0.0}
+            entries.append(entry)
+            if entry['cached']:
+                continue
+            args = (spec.name, inputs, os.path.join(cache_dir, name), ext)
+            if pool is None:
+                entry['draw_s'] = draw_figure(*args)
+            else:
+                pending[pool.submit(draw_figure, *args)] = entry
+        for future in as_completed(pending):
+            pending[future]['draw_s'] = future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+    for entry in entries:
+        _publish(os.path.join(cache_dir, entry['file']), os.path.join(out_dir, 'figures'), entry)
+    return entries
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+body {{ font-family: sans-serif; max-width: 1100px; margin: 2em auto; color: #222; }}
+table {{ border-collapse: collapse; font-size: 0.85em; margin-bottom: 1.5em; }}
+th, td {{ padding: 0.2em 0.6em; border-bottom: 1px solid #ddd; text-align: right; }}
+figure {{ margin: 2em 0; }}
+img {{ max-width: 100%; height: auto; }}
+iframe {{ border: 0; width: 100%; height: 640px; }}
+</style>
+</head>
+<body>
+<h1>{title}</h1>
+<h2>Tables</h2>
+{tables}
+<h2>Figures</h2>
+{figures}
+</body>
+</html>
+"""
+
+
+def write_html(path, tables, entries, title='Project 1: Airbnb listings in New York City'):
+    """The report page, with the figures referenced from figures/."""
+    parts = []
+    for name, table in tables.items():
+        frame = table if isinstance(table, pd.DataFrame) else pd.DataFrame(table)
+        parts.append(f'<h3>{html.escape(name)}</h3>\n'
+                     + frame.to_html(border=0, float_format='{:,.2f}'.format, na_rep=''))
+    figures = []
+    for e in entries:
+        src = html.escape(f'figures/{e["file"]}')
+        label = html.escape(e['name'].replace('_', ' '))
+        if e['kind'] == 'plotly':
+            body = f'<iframe src="{src}" title="{label}" loading="lazy"></iframe>'
+        else:
+            body = f'<img src="{src}" alt="{label}" loading="lazy" decoding="async">'
+        figures.append(f'<figure id="{html.escape(e["name"])}">{body}<figcaption>{label}</figcaption></figure>')
+    page = PAGE.format(title=html.escape(title), tables='\n'.join(parts), figures='\n'.join(figures))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(page)
+    return path
+
+
+def build(data, specs=None, out_dir='report', workers=None, fmt='png', cache_dir=None, use_cache=True):
+    """Tables, figures and report.html for `data` (a report.ReportData) in out_dir."""
+    specs = report.FIGURES if specs is None else specs
+    os.makedirs(out_dir, exist_ok=True)
+    entries = render_figures(data, specs, out_dir, workers, fmt, cache_dir, use_cache)
+    page = write_html(os.path.join(out_dir, 'report.html'), data.tables(), entries)
+    return page, entries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the Project 1 report as HTML with cached figures.')
+    parser.add_argument('path', nargs='?', default='AB_NYC_2019.csv', help='listings CSV')
+    parser.add_argument('--out-dir', default='report', help='where report.html and figures/ are written')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes drawing figures (default: all cores)')
+    parser.add_argument('--format', choices=FORMATS, default='png', help='matplotlib figure format')
+    parser.add_argument('--figures', help='comma-separated figure names (default: all)')
+    parser.add_argument('--cache-dir', help='figure cache (default: .cache/figures next to the CSV)')
+    parser.add_argument('--no-cache', action='store_true', help='redraw every figure')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    specs = report.select_figures(args.figures.split(',') if args.figures else None)
+    page, entries = build(report.ReportData(args.path), specs, args.out_dir, args.workers,
+                          args.format, args.cache_dir, not args.no_cache)
+    for e in entries:
+        state = 'cached' if e['cached'] else f'drawn in {e["draw_s"]:.2f}s'
+        print(f'{e["file"]:<44} {e["bytes"] / 1024:>7.1f} KB  inputs {e["inputs_s"]:.2f}s, {state}')
+    figures_kb = sum(e['bytes'] for e in entries) / 1024
+    print(f'{page}: {os.path.getsize(page) / 1024:.1f} KB + {len(entries)} figures {figures_kb:.1f} KB, '
+          f'{sum(not e["cached"] for e in entries)} drawn, built in {time.perf_counter() - start:.2f}s')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
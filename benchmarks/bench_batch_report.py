@@ -0,0 +1,74 @@
+"""Batch report build: cold vs cached figures, serial vs process pool, artifact size.
+
+For each size a synthetic listings file is reported four times into a fresh
+figure cache:
+
+serial   -- cold cache, figures drawn one after another
+pool     -- cold cache, figures drawn by `workers` processes
+cached   -- every figure found in the cache (inputs are still computed)
+1 change -- the price of one listing changed, so only the figures drawn
+            from its aggregates are redrawn
+
+The size of report.html plus its figures is compared with the notebook's
+HTML export, which embeds every plot.
+
+    python benchmarks/bench_batch_report.py                 # 48,895 rows, all cores
+    python benchmarks/bench_batch_report.py 1000000 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import report
+from batch_report import build
+from synthetic_listings import make_listings
+
+EXPORT = os.path.join(ROOT, 'Project 1 + (Research Question) (1).html')
+
+
+def timed_build(csv, out_dir, cache_dir, workers):
+    start = time.perf_counter()
+    page, entries = build(report.ReportData(csv), out_dir=out_dir, workers=workers, cache_dir=cache_dir)
+    size = os.path.getsize(page) + sum(e['bytes'] for e in entries)
+    return time.perf_counter() - start, sum(not e['cached'] for e in entries), size
+
+
+def run(n, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        df = make_listings(n)
+        csv = os.path.join(tmp, 'listings.csv')
+        df.to_csv(csv, index=False)
+        out = os.path.join(tmp, 'report')
+        rows = {}
+        rows['serial'] = timed_build(csv, out, os.path.join(tmp, 'cache-serial'), 1)
+        rows['pool'] = timed_build(csv, out, os.path.join(tmp, 'cache-pool'), workers)
+        rows['cached'] = timed_build(csv, out, os.path.join(tmp, 'cache-pool'), workers)
+        df.loc[0, 'price'] += 1
+        df.to_csv(csv, index=False)
+        rows['1 change'] = timed_build(csv, out, os.path.join(tmp, 'cache-pool'), workers)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sizes', type=int, nargs='*', default=[48_895])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    report.set_headless()
+    print(f'{"rows":>10} {"build":<9} {"seconds":>8} {"drawn":>6} {"report KB":>10}')
+    for n in args.sizes:
+        for label, (seconds, drawn, size) in run(n, args.workers).items():
+            print(f'{n:>10,} {label:<9} {seconds:>8.2f} {drawn:>6} {size / 1024:>10.1f}')
+    if os.path.exists(EXPORT):
+        print(f'notebook HTML export: {os.path.getsize(EXPORT) / 1024:.1f} KB')
+
+
+if __name__ == '__main__':
+    main()
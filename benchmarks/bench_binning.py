@@ -0,0 +1,106 @@
+"""Render time and peak memory: raw-array distribution plots vs pre-binned ones.
+
+Each case draws the figure with the Agg backend and renders it to an
+in-memory PNG, so the timing includes the actual rasterisation. Peak memory
+is the tracemalloc peak while the case runs.
+
+    python benchmarks/bench_binning.py                 # 48,895 and 1,000,000 rows
+    python benchmarks/bench_binning.py 50000 5000000
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+
+from agg_cube import build_cube
+from binning import Histogram, data_bin_edges, kde_grid, plot_histogram, plot_violins, scott_bandwidth
+from synthetic_listings import make_listings
+
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room']
+
+
+def raw_price_hist(df, cube):
+    sns.histplot(df['price'], bins=100, kde=False, color='skyblue')
+    plt.xlim(0, 1500)
+
+
+def binned_price_hist(df, cube):
+    hist = Histogram(data_bin_edges(df['price'].min(), df['price'].max(), 100, hi=1500)).update(df['price'])
+    plot_histogram(plt.gca(), hist, color='skyblue')
+    plt.xlim(0, 1500)
+
+
+def raw_review_hist(df, cube):
+    sns.histplot(df['number_of_reviews'], bins=50, kde=False, color='skyblue')
+    plt.xlim(0, 300)
+
+
+def binned_review_hist(df, cube):
+    reviews = df['number_of_reviews']
+    hist = Histogram(data_bin_edges(reviews.min(), reviews.max(), 50, hi=300)).update(reviews)
+    plot_histogram(plt.gca(), hist, color='skyblue')
+    plt.xlim(0, 300)
+
+
+def raw_violin(df, cube):
+    plt.violinplot([df[df['room_type'] == r]['number_of_reviews'].values for r in ROOM_TYPES])
+    plt.ylim(0, 300)
+
+
+def binned_violin(df, cube):
+    codes = pd.Categorical(df['room_type'], categories=ROOM_TYPES).codes
+    bins = Histogram(np.arange(-0.5, 400.5), n_groups=3).update(df['number_of_reviews'], codes)
+    stats = cube.rollup('room_type').loc[ROOM_TYPES]
+    densities = []
+    for i, room in enumerate(ROOM_TYPES):
+        bw = scott_bandwidth(stats.loc[room, 'count'], stats.loc[room, 'number_of_reviews_std'])
+        grid, density = kde_grid(bins, bw, group=i)
+        densities.append(density)
+    plot_violins(plt.gca(), grid, densities)
+    plt.ylim(0, 300)
+
+
+CASES = [
+    ('price histogram', raw_price_hist, binned_price_hist),
+    ('reviews histogram', raw_review_hist, binned_review_hist),
+    ('violin by room type', raw_violin, binned_violin),
+]
+
+
+def measure(draw, df, cube):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fig = plt.figure(figsize=(10, 6))
+    draw(df, cube)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def main(sizes):
+    print(f'{"rows":>10}  {"case":<20} {"raw s":>8} {"binned s":>9} {"raw MB":>8} {"binned MB":>10}')
+    for n in sizes:
+        df = make_listings(n)
+        cube = build_cube(df)
+        for name, raw, binned in CASES:
+            raw_s, raw_mb = measure(raw, df, cube)
+            bin_s, bin_mb = measure(binned, df, cube)
+            print(f'{n:>10,}  {name:<20} {raw_s:>8.3f} {bin_s:>9.3f} {raw_mb:>8.1f} {bin_mb:>10.1f}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
@@ -0,0 +1,66 @@
+"""Throughput of duplicate detection: df.duplicated() vs DuplicateDetector.
+
+Runs on synthetic listings with a small share of repeated rows. Reports rows
+per second, the duplicate count (to check the detectors agree) and the
+memory held by the digest store.
+
+    python benchmarks/bench_duplicates.py                 # 48,895 and 1,000,000 rows
+    python benchmarks/bench_duplicates.py 5000000
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from duplicates import find_duplicates
+from synthetic_listings import make_listings
+
+
+def with_repeats(n, share=0.01, seed=0):
+    df = make_listings(n, seed=seed)
+    rng = np.random.default_rng(seed)
+    repeats = df.iloc[rng.integers(0, n, int(n * share))]
+    return pd.concat([df, repeats], ignore_index=True)
+
+
+def run(name, fn, n):
+    start = time.perf_counter()
+    count, nbytes = fn()
+    seconds = time.perf_counter() - start
+    store = f'{nbytes / 2**20:8.2f}' if nbytes is not None else f'{"-":>8}'
+    print(f'{n:>10,}  {name:<28} {seconds:>7.3f}s {n / seconds / 1e6:>8.2f} Mrows/s {count:>8,} {store} MB')
+
+
+def main(sizes):
+    print(f'{"rows":>10}  {"method":<28} {"time":>8} {"throughput":>16} {"dups":>8} {"store":>11}')
+    for n in sizes:
+        df = with_repeats(n)
+        rows = len(df)
+
+        def pandas_all():
+            return int(df.duplicated().sum()), None
+
+        def pandas_key():
+            return int(df.duplicated(['id']).sum()), None
+
+        def detector(**kwargs):
+            def fn():
+                d = find_duplicates(df, **kwargs)
+                return d.count, d.nbytes
+            return fn
+
+        run('df.duplicated()', pandas_all, rows)
+        run('detector, one chunk', detector(), rows)
+        run('detector, 100k chunks', detector(chunksize=100_000), rows)
+        run('detector, bloom 1%', detector(chunksize=100_000, bloom=True, capacity=rows), rows)
+        run("df.duplicated(['id'])", pandas_key, rows)
+        run("detector, key=['id']", detector(key=['id'], chunksize=100_000), rows)
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
@@ -0,0 +1,96 @@
+"""Top-10 neighbourhoods: the notebook's value_counts cell vs TopK.
+
+notebook -- value_counts(), a reduced column added to the frame and a second
+            value_counts() to order the plot, on string columns (what the Top 10
+            cell did before the vocabulary encoding)
+exact    -- TopK build (counts per group x room type) and top(10, other=...)
+query    -- top(10) overall, for one group and for one room type on a built TopK
+sketch   -- the rows split into `cities` files whose neighbourhoods are all
+            distinct (prefixed by city), one TopK(capacity=64) per file, merged;
+            recall is the share of the exact top 10 the sketch reports
+
+    python benchmarks/bench_heavy_hitters.py                  # 48,895 and 1,000,000 rows
+    python benchmarks/bench_heavy_hitters.py 10000000
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from heavy_hitters import TopK, build_top_k
+from synthetic_listings import make_listings
+
+CITIES = 20
+CAPACITY = 64
+
+
+def timed(fn, repeat=3):
+    best = np.inf
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return out, best
+
+
+def notebook_top10(frame):
+    frame = frame.copy()
+    top = frame['neighbourhood'].value_counts().index[:10]
+    frame['neighbourhood_reduced'] = frame['neighbourhood'].where(frame['neighbourhood'].isin(top), 'Other')
+    return frame['neighbourhood_reduced'].value_counts()
+
+
+def as_cities(df, cities):
+    """`cities` chunks of df whose neighbourhood labels are distinct per chunk."""
+    out = []
+    for i, chunk in enumerate(np.array_split(np.arange(len(df)), cities)):
+        part = df.iloc[chunk].copy()
+        # Later cities are smaller, so the heavy hitters are not all from one file
+        part = part.iloc[:max(len(part) * (cities - i) // cities, 1)]
+        part['neighbourhood'] = f'city{i}:' + part['neighbourhood'].astype(str)
+        out.append(part)
+    return out
+
+
+def run(n):
+    df = make_listings(n)
+    columns = ['neighbourhood', 'neighbourhood_group', 'room_type']
+    strings = df[columns].astype(object)
+    expected, t_notebook = timed(lambda: notebook_top10(strings))
+    got, t_exact = timed(lambda: build_top_k(df).top(10, other='Other'))
+    top = build_top_k(df)
+    _, t_query = timed(lambda: (top.top(10), top.top(10, neighbourhood_group='Brooklyn'),
+                                top.top(10, room_type='Private room')))
+    exact_ok = np.array_equal(np.sort(got.to_numpy()), np.sort(expected.to_numpy()))
+
+    cities = as_cities(df[columns], CITIES)
+    truth = pd.concat(cities)['neighbourhood'].value_counts().index[:10]
+
+    def sketch():
+        merged = TopK(capacity=CAPACITY)
+        for part in cities:
+            merged.merge(TopK(capacity=CAPACITY).update(part))
+        return merged
+
+    merged, t_sketch = timed(sketch, repeat=1)
+    recall = len(set(merged.top(10).index) & set(truth)) / 10
+    return {'rows': n, 'notebook s': t_notebook, 'exact s': t_exact, 'query ms': t_query * 1e3,
+            'sketch s': t_sketch, 'recall': recall, 'match': exact_ok}
+
+
+def main(sizes):
+    print(f'{"rows":>10} {"notebook":>9} {"exact":>8} {"3 queries":>10} '
+          f'{"sketch x" + str(CITIES):>11} {"recall":>7}  match')
+    for n in sizes:
+        r = run(n)
+        print(f'{n:>10,} {r["notebook s"]:>8.3f}s {r["exact s"]:>7.3f}s {r["query ms"]:>8.2f}ms '
+              f'{r["sketch s"]:>10.3f}s {r["recall"]:>7.0%}  {r["match"]}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
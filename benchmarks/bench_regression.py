@@ -0,0 +1,61 @@
+"""Fixed-effects regression vs a dense statsmodels fit of the same model.
+
+    price ~ C(neighbourhood) + C(room_type) + number_of_reviews
+
+Reports wall time and tracemalloc peak for both, and the largest difference
+in the shared coefficients and classical standard errors. statsmodels is only
+needed for the comparison and is skipped when it is not installed.
+
+    python benchmarks/bench_regression.py                 # 48,895 and 200,000 rows
+    python benchmarks/bench_regression.py 1000000         # dense fit needs ~7 GB here
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from regression import fit_price_model
+from synthetic_listings import make_listings
+
+COLUMNS = ['neighbourhood', 'room_type', 'number_of_reviews', 'price']
+SHARED = {'number_of_reviews': 'number_of_reviews',
+          'room_type[Private room]': 'C(room_type)[T.Private room]',
+          'room_type[Shared room]': 'C(room_type)[T.Shared room]'}
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    out = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    return out, seconds, peak
+
+
+def main(sizes):
+    try:
+        import statsmodels.formula.api as smf
+    except ImportError:
+        smf = None
+        print('statsmodels not installed; timing the fixed-effects fit only')
+    print(f'{"rows":>10}  {"method":<22} {"time":>8} {"peak MB":>9} {"max |dcoef|":>12} {"max |dse|":>10}')
+    for n in sizes:
+        df = make_listings(n)[COLUMNS]
+        fe, seconds, peak = measure(lambda: fit_price_model(df))
+        print(f'{n:>10,}  {"absorbed FE (ours)":<22} {seconds:>7.3f}s {peak:>9.1f}')
+        if smf is None:
+            continue
+        dense = df.astype({'neighbourhood': str, 'room_type': str})
+        sm, seconds, peak = measure(lambda: smf.ols(
+            'price ~ C(neighbourhood) + C(room_type) + number_of_reviews', dense).fit())
+        dcoef = max(abs(fe.params[a] - sm.params[b]) for a, b in SHARED.items())
+        dse = max(abs(fe.bse()[a] - sm.bse[b]) for a, b in SHARED.items())
+        print(f'{n:>10,}  {"statsmodels dense OLS":<22} {seconds:>7.3f}s {peak:>9.1f} {dcoef:>12.2e} {dse:>10.2e}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 200_000])
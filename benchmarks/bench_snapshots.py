@@ -0,0 +1,63 @@
+"""Delta update of the report state vs rebuilding it from the new snapshot.
+
+A synthetic snapshot is changed by a given fraction of its rows (a third
+each inserted, updated and removed); the diff + apply time is compared with a
+full ReportState.build of the new snapshot, and the updated tables are checked
+against the rebuilt ones. The state keeps exact sketches (the default), which
+removal needs.
+
+    python benchmarks/bench_snapshots.py                  # 48,895 and 1,000,000 rows
+    python benchmarks/bench_snapshots.py 200000
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from pipeline import tables_equal
+from snapshots import SNAPSHOT_COLUMNS, ReportState, diff_snapshots
+from synthetic_listings import make_listings
+
+FRACTIONS = [0.0001, 0.001, 0.01, 0.1]
+
+
+def change(df, fraction, seed=0):
+    """A new snapshot with `fraction` of the rows inserted, updated or removed."""
+    rng = np.random.default_rng(seed)
+    k = max(int(len(df) * fraction / 3), 1)
+    picked = rng.choice(len(df), 2 * k, replace=False)
+    new = df.drop(index=df.index[picked[:k]])
+    updated = df.index[picked[k:]]
+    new.loc[updated, 'price'] += rng.integers(1, 20, k)
+    inserted = make_listings(k, seed=seed + 1, start_id=int(df['id'].max()) + 1)[SNAPSHOT_COLUMNS]
+    return pd.concat([new, inserted], ignore_index=True)
+
+
+def main(sizes):
+    print(f'{"rows":>10} {"changed":>9} {"diff":>8} {"apply":>8} {"rebuild":>8}  tables match')
+    for n in sizes:
+        old = make_listings(n)[SNAPSHOT_COLUMNS]
+        for fraction in FRACTIONS:
+            new = change(old, fraction)
+            state = ReportState.build(old)
+            start = time.perf_counter()
+            diff = diff_snapshots(old, new)
+            t_diff = time.perf_counter() - start
+            start = time.perf_counter()
+            state.apply(diff, new)
+            t_apply = time.perf_counter() - start
+            start = time.perf_counter()
+            fresh = ReportState.build(new)
+            t_build = time.perf_counter() - start
+            differ = tables_equal(fresh.tables(), state.tables(), rtol=1e-6)
+            print(f'{n:>10,} {len(diff):>9,} {t_diff:>7.3f}s {t_apply:>7.3f}s {t_build:>7.3f}s  '
+                  f'{"yes" if not differ else ", ".join(differ)}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
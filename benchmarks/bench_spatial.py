@@ -0,0 +1,79 @@
+"""Grid index queries vs a full-frame scan.
+
+For each size, random query points near the synthetic listings ask for the
+median price within 500 m and the 10 nearest listings of the same room type.
+The scan baseline computes the distance to every listing in NumPy (already
+vectorized, no Python loop over rows). Answers are checked against the scan.
+
+    python benchmarks/bench_spatial.py                  # 48,895 and 1,000,000 rows
+    python benchmarks/bench_spatial.py 10000000
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from spatial_index import SpatialGrid
+from synthetic_listings import make_listings
+
+RADIUS = 500
+K = 10
+
+
+def per_query(fn, queries):
+    start = time.perf_counter()
+    out = [fn(*q) for q in queries]
+    return out, (time.perf_counter() - start) / len(queries) * 1e6
+
+
+def run(n, n_queries=500, n_scans=50):
+    df = make_listings(n)
+    start = time.perf_counter()
+    grid = SpatialGrid.from_frame(df)
+    build = time.perf_counter() - start
+
+    rng = np.random.default_rng(1)
+    rows = rng.integers(0, n, n_queries)
+    queries = [(float(df['latitude'].iat[i]) + rng.normal(0, 0.002), float(df['longitude'].iat[i]),
+                grid.rooms[rng.integers(len(grid.rooms))]) for i in rows]
+
+    x_all, y_all = grid.project(df['latitude'].to_numpy(), df['longitude'].to_numpy())
+    price = df['price'].to_numpy(dtype=float)
+    room = df['room_type'].astype(object).to_numpy()
+
+    def scan_median(lat, lon, room_type):
+        x, y = grid.project(lat, lon)
+        inside = np.hypot(x_all - x, y_all - y) <= RADIUS
+        return float(np.median(price[inside])) if inside.any() else float('nan')
+
+    def scan_nearest(lat, lon, room_type):
+        x, y = grid.project(lat, lon)
+        dist = np.where(room == room_type, np.hypot(x_all - x, y_all - y), np.inf)
+        return np.sort(np.partition(dist, K - 1)[:K])
+
+    grid_median, t_grid_median = per_query(lambda lat, lon, r: grid.median_price(lat, lon, RADIUS), queries)
+    grid_knn, t_grid_knn = per_query(lambda lat, lon, r: grid.nearest(lat, lon, K, r)[1], queries)
+    scan_med, t_scan_median = per_query(scan_median, queries[:n_scans])
+    scan_knn, t_scan_knn = per_query(scan_nearest, queries[:n_scans])
+
+    ok = (np.allclose(grid_median[:n_scans], scan_med, equal_nan=True)
+          and all(np.allclose(a, b) for a, b in zip(grid_knn, scan_knn)))
+    return {'rows': n, 'build s': build,
+            'median scan us': t_scan_median, 'median grid us': t_grid_median,
+            'knn scan us': t_scan_knn, 'knn grid us': t_grid_knn, 'match': ok}
+
+
+def main(sizes):
+    print(f'{"rows":>10} {"build":>8}  {"median: scan":>13} {"grid":>8}  {"kNN: scan":>10} {"grid":>8}  match')
+    for n in sizes:
+        r = run(n)
+        print(f'{n:>10,} {r["build s"]:>7.3f}s  {r["median scan us"]:>11.0f}us {r["median grid us"]:>6.0f}us'
+              f'  {r["knn scan us"]:>8.0f}us {r["knn grid us"]:>6.0f}us  {r["match"]}')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
@@ -0,0 +1,80 @@
+"""Startup cost of the report: eager notebook imports vs report.py.
+
+Each case runs in a fresh interpreter under `python -X importtime`; the
+reported import time is the sum of the per-module self times from stderr,
+and wall is the whole subprocess. Every case is repeated and the fastest run
+is kept. The heaviest top-level imports of each case are listed at the end.
+
+    eager imports       the original import cell of `Project 1 .py`
+    import report       the entry point module (data libraries only)
+    report --list       full CLI start-up, nothing loaded or drawn
+    + plotting on Agg   `import report` + matplotlib/seaborn on the Agg backend
+
+    python benchmarks/bench_startup.py            # 5 repeats
+    python benchmarks/bench_startup.py 10
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+EAGER = """
+from mpl_toolkits.mplot3d import Axes3D
+from sklearn.preprocessing import StandardScaler
+import matplotlib
+import matplotlib.colors as mplc
+import matplotlib.patches as patches
+import matplotlib.pyplot as plt
+import plotly.express as px
+import seaborn as sns
+import numpy as np
+import os
+import pandas as pd
+"""
+
+CASES = [
+    ('eager imports', ['-c', EAGER]),
+    ('import report', ['-c', 'import report']),
+    ('report --list', [os.path.join(ROOT, 'report.py'), '--list']),
+    ('+ plotting on Agg', ['-c', 'import report; report.set_headless(); report._pyplot()']),
+]
+
+
+def importtime(args):
+    """(wall seconds, summed import seconds, {top-level module: cumulative seconds})."""
+    env = dict(os.environ, PYTHONPATH=ROOT, MPLBACKEND='Agg')
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', *args], cwd=ROOT, env=env,
+                          capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    total, top = 0, {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        total += int(self_us)
+        if not name.startswith('  '):   # nesting is shown by indentation
+            top[name.strip()] = int(cumulative_us) / 1e6
+    return wall, total / 1e6, top
+
+
+def main(repeats=5):
+    rows = []
+    for label, args in CASES:
+        runs = [importtime(args) for _ in range(repeats)]
+        rows.append((label, min(r[0] for r in runs), min(r[1] for r in runs), runs[0][2]))
+
+    base_wall = rows[0][1]
+    print(f'{"case":<20}{"wall s":>9}{"imports s":>11}{"vs eager":>10}')
+    for label, wall, imports, _ in rows:
+        print(f'{label:<20}{wall:>9.3f}{imports:>11.3f}{base_wall / wall:>9.1f}x')
+    for label, _, _, top in rows:
+        heavy = sorted(top.items(), key=lambda kv: -kv[1])[:5]
+        print(f'\n{label}: ' + ', '.join(f'{name} {secs:.2f}s' for name, secs in heavy))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
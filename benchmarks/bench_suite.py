@@ -0,0 +1,354 @@
+"""Per-stage benchmark of the Project 1 report, with a JSON report and baseline check.
+
+Every stage of `Project 1 .py` runs on synthetic listings with the
+AB_NYC_2019 schema: CSV load, missing/duplicate checks, summary table, IQR
+outliers, 95th-percentile filter, fraction matrix, and each figure of
+report.FIGURES drawn headless. Every measurement runs in a forked child
+process. The child loads what the stage needs from the typed cache (not
+measured), resets its peak RSS, and runs the stage once, so memory
+held by earlier stages does not mix into the result. Per stage:
+
+- wall_s         wall time
+- peak_rss_mb    peak RSS above the RSS at the start of the stage (Linux only)
+- alloc_blocks   net Python memory blocks still allocated after the stage
+- alloc_peak_mb  peak of memory traced by tracemalloc (NumPy buffers
+                 included) during a separate, traced run
+
+With --repeat the median of the runs is reported. Synthetic CSVs are written
+once to --data-dir and reused. Cached derived data (mean price intervals,
+spatial index) goes to a fresh directory for every run, so each run starts
+with a cold cache.
+
+    python benchmarks/bench_suite.py --sizes 50000 1000000 --out results.json
+    python benchmarks/bench_suite.py --sizes 50000 --save-baseline benchmarks/baseline.json
+    python benchmarks/bench_suite.py --sizes 50000 --baseline benchmarks/baseline.json
+
+A result is flagged as a regression when its wall time or peak RSS exceeds
+the baseline by more than --tolerance (relative) and by more than a small
+absolute margin. The exit status is 1 if anything regressed. A baseline only
+compares meaningfully on the machine that recorded it. Its "meta" entry names
+the machine, CPU count and library versions, and the check is skipped (with a
+message) when any of MACHINE_KEYS differ from the current run. "meta" also
+holds the commit and a digest of the tracked .py files. A baseline is recorded
+before it is committed, so its commit is the parent of the one that adds it;
+the digest matches the tree it is committed in.
+
+benchmarks/baseline.json holds the 50,000 and 1,000,000 row results of the
+full report (every stage and figure), recorded on a single-CPU machine with
+5 GB of RAM. It leaves out the 10,000,000 row size. Every stage runs in its
+own child, which loads the 10M-row frame again (about 1 GB), so the suite
+would run for well over an hour on one CPU. The traced CSV load would also
+come close to the memory limit. Re-record the baseline with --save-baseline
+when stages change.
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import numpy as np
+import pandas as pd
+
+import report
+from agg_cube import build_cube
+from listings_loader import cache_key, read_listings_csv
+from outliers import find_outliers
+from perf import peak_rss_mb, reset_peak_rss, rss_mb
+from pipeline import OUTLIER_COLUMNS, PRICE_LIMIT_Q, SUMMARY_VARIABLES
+from quantile_sketch import sketch_columns
+from summary_stats import summarize
+from synthetic_listings import write_listings
+from vocabulary import load_encoded
+
+SIZES = [50_000, 1_000_000, 10_000_000]
+DATA_DIR = os.path.join(ROOT, '.cache', 'bench')
+MIN_WALL_S = 0.05       # absolute margins below which changes are noise
+MIN_PEAK_MB = 16
+# Baselines from a machine differing in any of these are not compared
+MACHINE_KEYS = ['platform', 'machine', 'cpus', 'python', 'numpy', 'pandas']
+
+
+# Stages: setup(ctx) prepares inputs (not measured), run(ctx) is measured
+
+def _frame(ctx):
+    ctx['df'] = load_encoded(ctx['csv'])
+
+
+def _report_data(ctx):
+    _frame(ctx)
+    df = ctx['df']
+    sketches = sketch_columns(df, OUTLIER_COLUMNS)
+    data = report.ReportData(ctx['path'], df=df, cube=build_cube(df), sketches=sketches)
+    # Shared by several figures, so not charged to any one of them
+    data.filtered, data.summary
+    cache_key(ctx['path'])      # hash the CSV up front, as a cached run would
+    report.set_headless()
+    report._pyplot()
+    try:
+        import plotly.graph_objects
+    except ImportError:
+        pass
+    ctx['data'] = data
+
+
+def _csv_load(ctx):
+    return read_listings_csv(ctx['csv'])
+
+
+def _missing_duplicates(ctx):
+    df = ctx['df']
+    nulls = df.isnull()
+    return nulls.any(axis=0), nulls.sum(), len(df.dropna()), int(df.duplicated().sum())
+
+
+def _summary(ctx):
+    return summarize(ctx['df'], SUMMARY_VARIABLES)
+
+
+def _iqr_outliers(ctx):
+    outliers = find_outliers(ctx['df'], OUTLIER_COLUMNS)
+    return outliers.counts(), outliers.rows(ctx['df'], 'price')
+
+
+def _price_filter(ctx):
+    df = ctx['df']
+    return df[df['price'] <= df['price'].quantile(PRICE_LIMIT_Q)]
+
+
+def _fraction_matrix(ctx):
+    return build_cube(ctx['df']).fraction_matrix('neighbourhood_group', 'room_type')
+
+
+def _figure(spec):
+    def run(ctx):
+        return report.emit(spec.draw(spec.inputs(ctx['data'])), spec, ctx['tmp'])
+    return run
+
+
+STAGES = {
+    'csv_load': (None, _csv_load),
+    'missing_duplicates': (_frame, _missing_duplicates),
+    'summary': (_frame, _summary),
+    'iqr_outliers': (_frame, _iqr_outliers),
+    'price_filter': (_frame, _price_filter),
+    'fraction_matrix': (_frame, _fraction_matrix),
+}
+STAGES.update({'fig_' + spec.name: (_report_data, _figure(spec)) for spec in report.FIGURES})
+
+
+# Measurement
+
+def _measure(stage, csv, trace, conn):
+    """Child process: set up `stage`, run it once and send the measurements."""
+    tmp = tempfile.mkdtemp(prefix='bench-')
+    try:
+        # Frames load from the typed cache next to `csv`; everything else is cached
+        # next to `path`, a link to the CSV in a fresh directory, so it starts cold
+        path = os.path.join(tmp, os.path.basename(csv))
+        os.symlink(csv, path)
+        setup, run = STAGES[stage]
+        ctx = {'csv': csv, 'path': path, 'tmp': tmp}
+        if setup:
+            setup(ctx)
+        result = {}
+        if trace:
+            tracemalloc.start()
+            run(ctx)
+            result['alloc_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+        else:
+            result['peak_reset'] = reset_peak_rss()
+            start_rss, start_blocks = rss_mb(), sys.getallocatedblocks()
+            start = time.perf_counter()
+            out = run(ctx)
+            result['wall_s'] = time.perf_counter() - start
+            result['peak_rss_mb'] = max(peak_rss_mb() - start_rss, 0.0)
+            result['alloc_blocks'] = sys.getallocatedblocks() - start_blocks
+            del out
+        conn.send(result)
+    except BaseException as e:
+        conn.send({'error': f'{type(e).__name__}: {e}'})
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        conn.close()
+
+
+def measure(stage, csv, trace=False):
+    ctx = multiprocessing.get_context('fork')
+    recv, send = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_measure, args=(stage, csv, trace, send))
+    proc.start()
+    send.close()
+    try:
+        result = recv.recv()
+    except EOFError:
+        result = {'error': 'child process died (out of memory?)'}
+    proc.join()
+    return result
+
+
+def _prepare(path, n):
+    if not os.path.exists(path):
+        write_listings(path + '.tmp', n)
+        os.replace(path + '.tmp', path)
+    load_encoded(path)
+
+
+def dataset(n, data_dir=DATA_DIR):
+    """Synthetic CSV of `n` listings, written and cached (typed) on first use."""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'listings-{n}.csv')
+    # In a child, so the parent (forked for every measurement) stays small
+    proc = multiprocessing.get_context('fork').Process(target=_prepare, args=(path, n))
+    proc.start()
+    proc.join()
+    if proc.exitcode:
+        raise RuntimeError(f'could not prepare {path}')
+    return path
+
+
+def run_suite(sizes, stages, repeat=1, trace=True, data_dir=DATA_DIR, log=print):
+    results = []
+    for n in sizes:
+        csv = dataset(n, data_dir)
+        for stage in stages:
+            runs = [measure(stage, csv) for _ in range(repeat)]
+            errors = [r['error'] for r in runs if 'error' in r]
+            entry = {'stage': stage, 'rows': n}
+            if errors:
+                entry['error'] = errors[0]
+            else:
+                for key in ('wall_s', 'peak_rss_mb', 'alloc_blocks'):
+                    entry[key] = statistics.median(r[key] for r in runs)
+                entry['peak_rss_exact'] = all(r['peak_reset'] for r in runs)
+                if trace:
+                    traced = measure(stage, csv, trace=True)
+                    entry['alloc_peak_mb'] = traced.get('alloc_peak_mb')
+            results.append(entry)
+            log(format_entry(entry))
+    return results
+
+
+def _git(*args):
+    try:
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def source_digest():
+    """SHA-1 over the tracked .py files as they are on disk (None outside git)."""
+    files = _git('ls-files', '-z', '*.py')
+    if files is None:
+        return None
+    digest = hashlib.sha1()
+    for name in sorted(f for f in files.split('\0') if f):
+        digest.update(name.encode() + b'\0')
+        with open(os.path.join(ROOT, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def metadata():
+    commit = _git('rev-parse', '--short', 'HEAD')
+    return {'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': commit and commit.strip(), 'source': source_digest(),
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count(),
+            'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+# Baseline comparison
+
+def machine_mismatch(meta, baseline_meta):
+    """The MACHINE_KEYS on which two "meta" entries differ."""
+    return [k for k in MACHINE_KEYS if meta.get(k) != baseline_meta.get(k)]
+
+
+def compare(results, baseline, tolerance=0.25):
+    """Entries of `results` slower or bigger than the matching baseline entry."""
+    base = {(b['stage'], b['rows']): b for b in baseline['results'] if 'error' not in b}
+    regressions = []
+    for r in results:
+        b = base.get((r['stage'], r['rows']))
+        if b is None or 'error' in r:
+            continue
+        for key, margin in (('wall_s', MIN_WALL_S), ('peak_rss_mb', MIN_PEAK_MB)):
+            if r[key] > b[key] * (1 + tolerance) and r[key] - b[key] > margin:
+                regressions.append({'stage': r['stage'], 'rows': r['rows'], 'metric': key,
+                                    'baseline': b[key], 'value': r[key],
+                                    'ratio': r[key] / b[key] if b[key] else float('inf')})
+    return regressions
+
+
+def format_entry(e):
+    head = f'{e["rows"]:>11,} {e["stage"]:<32}'
+    if 'error' in e:
+        return f'{head} ERROR {e["error"]}'
+    alloc = e.get('alloc_peak_mb')
+    return (f'{head} {e["wall_s"]:>9.3f}s {e["peak_rss_mb"]:>9.1f} MB {e["alloc_blocks"]:>+10,}'
+            + (f' {alloc:>9.1f} MB' if alloc is not None else ''))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every stage of the Project 1 report.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='row counts')
+    parser.add_argument('--stages', help='comma-separated stage names (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per stage (median is reported)')
+    parser.add_argument('--no-trace', action='store_true', help='skip the tracemalloc run')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='where synthetic CSVs are kept')
+    parser.add_argument('--out', help='write the JSON report here')
+    parser.add_argument('--baseline', help='flag regressions against this JSON report')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative slowdown/growth')
+    parser.add_argument('--save-baseline', help='also write the JSON report here as the new baseline')
+    parser.add_argument('--list', action='store_true', help='list stage names and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(STAGES))
+        return 0
+    stages = args.stages.split(',') if args.stages else list(STAGES)
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f'unknown stages: {", ".join(unknown)}')
+
+    print(f'{"rows":>11} {"stage":<32} {"wall":>10} {"peak RSS":>12} {"blocks":>10} {"traced":>12}')
+    results = run_suite(args.sizes, stages, args.repeat, not args.no_trace, args.data_dir)
+    doc = {'meta': metadata(), 'results': results}
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        mismatch = machine_mismatch(doc['meta'], baseline.get('meta', {}))
+        if mismatch:
+            print(f'{args.baseline} was recorded on another machine ({", ".join(mismatch)} differ); '
+                  'skipping the regression check')
+        doc['regressions'] = [] if mismatch else compare(results, baseline, args.tolerance)
+        for r in doc['regressions']:
+            print(f'REGRESSION {r["rows"]:,} {r["stage"]} {r["metric"]}: '
+                  f'{r["baseline"]:.3f} -> {r["value"]:.3f} ({r["ratio"]:.2f}x)')
+        if not mismatch and not doc['regressions']:
+            print('no regressions against', args.baseline)
+    for target in (args.out, args.save_baseline):
+        if target:
+            with open(target, 'w', encoding='utf-8') as f:
+                json.dump(doc, f, indent=1)
+    return 1 if doc.get('regressions') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Object-dtype string columns vs vocabulary-encoded categoricals.
+
+Memory is pandas' deep memory usage of the string columns. Latencies are the
+best of several runs of the notebook's string operations and their code-based
+replacements:
+
+    room filters   df[col] == 'Entire home/apt' / 'Private room' / 'Shared room'
+    group mean     groupby(neighbourhood)['price'].mean() vs bincount on codes
+
+    python benchmarks/bench_vocabulary.py               # 48,895 and 1,000,000 rows
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from synthetic_listings import ROOM_TYPES, make_listings
+from vocabulary import ENCODED_COLUMNS, Vocabulary, encode_frame
+
+COLUMNS = ['name'] + ENCODED_COLUMNS
+
+
+def best(fn, repeats=5):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1e3
+
+
+def object_ops(df):
+    return {
+        'room filters': lambda: [df[df['room_type'] == r] for r in ROOM_TYPES],
+        'group mean': lambda: df.groupby('neighbourhood')['price'].mean(),
+    }
+
+
+def code_ops(df, vocab):
+    rooms = df['room_type'].cat.codes.to_numpy()
+    hood = df['neighbourhood'].cat.codes.to_numpy()
+    price = df['price'].to_numpy(dtype=float)
+    room_codes = [vocab['room_type'].code(r) for r in ROOM_TYPES]
+    return {
+        'room filters': lambda: [df[rooms == c] for c in room_codes],
+        'group mean': lambda: np.bincount(hood, weights=price) / np.bincount(hood),
+    }
+
+
+def main(sizes):
+    for n in sizes:
+        raw = make_listings(n)
+        objects = raw.astype({c: object for c in COLUMNS})
+        vocab = Vocabulary()
+        start = time.perf_counter()
+        encoded = encode_frame(objects, vocab, COLUMNS)
+        encode_s = time.perf_counter() - start
+
+        print(f'\n{n:,} rows (encoding took {encode_s:.3f}s)')
+        print(f'{"column":<20}{"object MB":>11}{"encoded MB":>12}{"labels":>9}')
+        for c in COLUMNS:
+            a = objects[c].memory_usage(deep=True, index=False) / 2**20
+            b = encoded[c].memory_usage(deep=True, index=False) / 2**20
+            print(f'{c:<20}{a:>11.2f}{b:>12.2f}{len(vocab[c]):>9,}')
+        print(f'{"operation":<20}{"object ms":>11}{"codes ms":>12}{"speedup":>9}')
+        slow, fast = object_ops(objects), code_ops(encoded, vocab)
+        for name in slow:
+            a, b = best(slow[name]), best(fast[name])
+            print(f'{name:<20}{a:>11.2f}{b:>12.2f}{a / b:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main([int(a) for a in sys.argv[1:]] or [48_895, 1_000_000])
@@ -0,0 +1,162 @@
+"""Pre-binned histograms and KDE grids for the distribution plots.
+
+Instead of handing the full price / number_of_reviews arrays to seaborn or
+matplotlib and clipping the view afterwards, the values are binned once into
+fixed (or log-spaced) edges that only cover the display range. The figures are
+drawn from those small count arrays, so drawing cost does not depend on the
+number of listings. Histograms can be filled chunk by chunk and merged.
+
+    hist = Histogram(data_bin_edges(0, 10000, 100, hi=1500)).update(df['price'])
+    plot_histogram(ax, hist, color='skyblue')
+"""
+
+import numpy as np
+
+
+def bin_edges(lo, hi, bins, log=False):
+    """`bins` + 1 edges over [lo, hi]; log spacing is on log1p so 0 is allowed."""
+    if log:
+        return np.expm1(np.linspace(np.log1p(lo), np.log1p(hi), bins + 1))
+    return np.linspace(lo, hi, bins + 1)
+
+
+def data_bin_edges(vmin, vmax, bins, hi=None):
+    """The edges np.histogram(values, bins) uses for values spanning [vmin, vmax],
+    cut after the first edge at or above `hi` (the display limit).
+
+    Bins keep the width (vmax - vmin) / bins of a plot over the full data range
+    that is clipped with xlim afterwards, but only the visible ones are filled.
+    """
+    edges = np.linspace(vmin, vmax, bins + 1)
+    if hi is not None:
+        edges = edges[:np.searchsorted(edges, hi) + 1]
+    return edges
+
+
+class Histogram:
+    """Mergeable counts over fixed edges; values outside the edges are only tallied."""
+
+    def __init__(self, edges, n_groups=1):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros((n_groups, self.edges.size - 1), dtype=np.int64)
+        self.below = np.zeros(n_groups, dtype=np.int64)
+        self.above = np.zeros(n_groups, dtype=np.int64)
+
+    def update(self, values, groups=None):
+        """Add values; `groups` holds an integer group code per value (default 0)."""
+        values = np.asarray(values, dtype=float)
+        codes = np.zeros(values.size, dtype=np.intp) if groups is None else np.asarray(groups, dtype=np.intp)
+        keep = ~np.isnan(values) & (codes >= 0)
+        values, codes = values[keep], codes[keep]
+        n_groups, n_bins = self.counts.shape
+        # Bins are right-open except the last one, as in np.histogram
+        idx = np.searchsorted(self.edges, values, side='right') - 1
+        idx[values == self.edges[-1]] = n_bins - 1
+        inside = (idx >= 0) & (idx < n_bins)
+        self.below += np.bincount(codes[idx < 0], minlength=n_groups)
+        self.above += np.bincount(codes[idx >= n_bins], minlength=n_groups)
+        flat = codes[inside] * n_bins + idx[inside]
+        self.counts += np.bincount(flat, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        return self
+
+    def merge(self, other):
+        self.counts += other.counts
+        self.below += other.below
+        self.above += other.above
+        return self
+
+    @property
+    def centres(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def total(self):
+        return self.counts.sum(axis=1) + self.below + self.above
+
+
+def kde_grid(hist, bandwidth, group=0):
+    """Gaussian KDE evaluated at the bin centres of a (fine) histogram.
+
+    The binned counts are convolved with a Gaussian kernel, which costs
+    O(bins) regardless of the number of values. `bandwidth` is in data units,
+    e.g. scott_bandwidth(n, std). The density is normalised over all values,
+    including those outside the histogram range.
+    """
+    width = np.diff(hist.edges)
+    if not np.allclose(width, width[0]):
+        raise ValueError('kde_grid needs evenly spaced bins')
+    step = width[0]
+    half = int(np.ceil(4 * bandwidth / step))
+    offsets = np.arange(-half, half + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    counts = hist.counts[group].astype(float)
+    density = np.convolve(counts, kernel, mode='same') if counts.size >= kernel.size \
+        else np.convolve(counts, kernel, mode='full')[half:half + counts.size]
+    total = hist.total()[group]
+    return hist.centres, density / total if total else density
+
+
+def scott_bandwidth(n, std, dims=1):
+    """Scott's rule bandwidth, as used by scipy's gaussian_kde and plt.violinplot."""
+    return std * n ** (-1.0 / (dims + 4))
+
+
+def plot_histogram(ax, hist, group=0, **kwargs):
+    """Draw histogram counts as filled steps (what histplot draws, without the data)."""
+    kwargs.setdefault('edgecolor', 'white')
+    kwargs.setdefault('linewidth', 0.5)
+    return ax.bar(hist.edges[:-1], hist.counts[group], width=np.diff(hist.edges),
+                  align='edge', **kwargs)
+
+
+def plot_violins(ax, grid, densities, positions=None, widths=0.5, extrema=None, **kwargs):
+    """Draw violins from precomputed KDE grids, scaled like plt.violinplot.
+
+    densities -- one density array per violin, all on `grid`
+    extrema   -- optional (min, max) per violin for the whisker line
+    """
+    positions = np.arange(1, len(densities) + 1) if positions is None else positions
+    kwargs.setdefault('alpha', 0.3)
+    bodies = []
+    for i, (pos, dens) in enumerate(zip(positions, densities)):
+        scale = 0.5 * widths / dens.max() if dens.max() > 0 else 0
+        bodies.append(ax.fill_betweenx(grid, pos - dens * scale, pos + dens * scale, **kwargs))
+        if extrema is not None:
+            lo, hi = extrema[i]
+            ax.vlines(pos, lo, hi, color='C0')
+            ax.hlines([lo, hi], pos - widths / 4, pos + widths / 4, color='C0')
+    ax.set_xticks(positions)
+    return bodies
+
+
+def box_stats(values, groups=None, whis=1.5):
+    """Boxplot statistics per group, in the format ax.bxp() draws.
+
+    Quartiles use pandas' linear interpolation like seaborn/matplotlib, and
+    whiskers reach the most extreme values within `whis` IQRs. Fliers are
+    reduced to their distinct values: coincident points draw identically, and
+    this keeps integer-valued columns such as price to at most a few thousand
+    points however many listings there are.
+    """
+    import pandas as pd
+
+    s = pd.Series(np.asarray(values, dtype=float))
+    keys = np.zeros(len(s), dtype=int) if groups is None else np.asarray(groups)
+    stats = []
+    for key, v in s.groupby(keys, sort=True):
+        v = v.dropna().to_numpy()
+        q1, med, q3 = np.quantile(v, [0.25, 0.5, 0.75])
+        lo, hi = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+        inside = v[(v >= lo) & (v <= hi)]
+        stats.append({'label': key, 'q1': q1, 'med': med, 'q3': q3,
+                      'whislo': inside.min(), 'whishi': inside.max(),
+                      'fliers': np.unique(v[(v < lo) | (v > hi)])})
+    return stats
+
+
+def plot_boxes(ax, stats, colors=None, **kwargs):
+    """Draw box_stats() output, coloured like seaborn's boxplot."""
+    artists = ax.bxp(stats, patch_artist=True, **kwargs)
+    for i, box in enumerate(artists['boxes']):
+        if colors is not None:
+            box.set_facecolor(colors[i % len(colors)])
+    return artists
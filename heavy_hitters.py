@@ -0,0 +1,325 @@
+"""Top-N neighbourhoods, overall or per group, from mergeable counts.
+
+TopK counts the labels of one column (neighbourhood by default) per cell of
+the `by` columns (neighbourhood_group x room_type by default). The top N
+overall, or for any neighbourhood group or room type, is answered by merging
+the matching cells, so the frame is never modified or re-counted. Each cell
+holds one of:
+
+- exact counts (CategoryCounts), the default, which suit a single city
+- a HeavyHitters sketch when `capacity` is given. It suits streamed
+  multi-city data, where the number of distinct neighbourhoods is unbounded.
+  The sketch combines:
+  - SpaceSaving, which monitors the `capacity` most frequent labels with
+    upper and lower bounds on their counts
+  - CountMin, which tightens those upper bounds and answers point queries
+    for any label
+
+Any label with more than count / capacity rows in a cell is guaranteed to be
+monitored there. All summaries merge across chunks, files and worker
+processes. Exact counts also support remove(). A sketch supports remove()
+only while it has never had to evict a label.
+
+    hoods = TopK('neighbourhood', by=['neighbourhood_group', 'room_type'])
+    hoods.update(df)
+    hoods.top(10, other='Other')                  # the notebook's Top 10 plot
+    hoods.top(5, neighbourhood_group='Brooklyn')
+    hoods.table(3, by='room_type')                # top 3 per room type
+"""
+
+import numpy as np
+import pandas as pd
+
+from listings_loader import cache_path, load_or_build
+from summary_stats import CategoryCounts
+
+TOP_BY = ['neighbourhood_group', 'room_type']
+
+# Bump when the pickled layout changes
+TOPK_VERSION = 1
+
+
+class CountMin:
+    """Count-Min sketch: `depth` rows of `width` counters, linear in the data.
+
+    estimate() never undercounts and overcounts by at most e * total / width
+    with probability 1 - exp(-depth). Labels are hashed with pandas' keyed
+    hash, so sketches built in different processes agree and can be merged.
+    """
+
+    def __init__(self, width=2048, depth=4, seed=0):
+        self.width, self.depth, self.seed = width, depth, seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+
+    def _columns(self, labels):
+        # Row d uses h1 + d * h2 (Kirsch-Mitzenmacher), both halves of one 64-bit hash
+        h = pd.util.hash_array(np.asarray(labels, dtype=object), hash_key=f'countmin{self.seed:08d}')
+        h1, h2 = h & np.uint64(0xFFFFFFFF), (h >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1 + rows * h2) % np.uint64(self.width)).astype(np.intp)
+
+    def add_counts(self, labels, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, cols in zip(self.table, self._columns(labels)):
+            np.add.at(row, cols, counts)
+        return self
+
+    def remove_counts(self, labels, counts):
+        return self.add_counts(labels, -np.asarray(counts, dtype=np.int64))
+
+    def merge(self, other):
+        if (other.width, other.depth, other.seed) != (self.width, self.depth, self.seed):
+            raise ValueError('Count-Min sketches differ in width, depth or seed')
+        self.table += other.table
+        return self
+
+    def estimate(self, labels):
+        cols = self._columns(labels)
+        return self.table[np.arange(self.depth)[:, None], cols].min(axis=0)
+
+
+class SpaceSaving:
+    """Mergeable Space-Saving summary of the `capacity` most frequent labels.
+
+    counts[i] never undercounts labels[i] and overcounts it by at most
+    errors[i]. A label that is not monitored occurs at most `floor` times. The
+    floor stays 0, and the counts stay exact, until a label has to be evicted.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.labels = pd.Index([], dtype=object)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+        self.floor = 0
+
+    @property
+    def exact(self):
+        return self.floor == 0
+
+    def add_counts(self, counts):
+        other = SpaceSaving(self.capacity)
+        other.labels = pd.Index(counts.index, dtype=object)
+        other.counts = counts.to_numpy(dtype=np.int64)
+        other.errors = np.zeros(len(counts), dtype=np.int64)
+        return self.merge(other)
+
+    def _aligned(self, labels):
+        pos = self.labels.get_indexer(labels)
+        counts = np.full(len(labels), self.floor, dtype=np.int64)
+        errors = counts.copy()
+        seen = pos >= 0
+        counts[seen], errors[seen] = self.counts[pos[seen]], self.errors[pos[seen]]
+        return counts, errors
+
+    def merge(self, other):
+        """Fold in another summary (Agarwal et al., mergeable summaries)."""
+        labels = self.labels.union(other.labels)
+        (c1, e1), (c2, e2) = self._aligned(labels), other._aligned(labels)
+        counts, errors = c1 + c2, e1 + e2
+        self.floor += other.floor
+        if len(labels) > self.capacity:
+            # union() sorts the labels, so a stable sort breaks ties by label
+            order = np.argsort(-counts, kind='stable')
+            self.floor = max(self.floor, int(counts[order[self.capacity]]))
+            keep = np.sort(order[:self.capacity])
+            labels, counts, errors = labels[keep], counts[keep], errors[keep]
+        self.labels, self.counts, self.errors = labels, counts, errors
+        return self
+
+    def remove_counts(self, counts):
+        if not self.exact:
+            raise ValueError('the summary has evicted labels and cannot remove counts; rebuild it')
+        pos = self.labels.get_indexer(counts.index)
+        if (pos < 0).any():
+            raise KeyError('cannot remove labels that were never added')
+        remaining = self.counts.copy()
+        np.subtract.at(remaining, pos, counts.to_numpy(dtype=np.int64))
+        keep = remaining > 0
+        self.labels, self.counts, self.errors = self.labels[keep], remaining[keep], self.errors[keep]
+        return self
+
+
+class HeavyHitters:
+    """SpaceSaving candidates with Count-Min estimates, with the CategoryCounts interface."""
+
+    def __init__(self, capacity=1000, width=2048, depth=4, seed=0):
+        self.space_saving = SpaceSaving(capacity)
+        self.count_min = CountMin(width, depth, seed)
+
+    def update(self, values):
+        return self.add_counts(CategoryCounts._value_counts(values))
+
+    def add_counts(self, counts):
+        self.space_saving.add_counts(counts)
+        self.count_min.add_counts(counts.index, counts.to_numpy())
+        return self
+
+    def merge(self, other):
+        self.space_saving.merge(other.space_saving)
+        self.count_min.merge(other.count_min)
+        return self
+
+    def remove(self, values):
+        return self.remove_counts(CategoryCounts._value_counts(values))
+
+    def remove_counts(self, counts):
+        self.space_saving.remove_counts(counts)
+        self.count_min.remove_counts(counts.index, counts.to_numpy())
+        return self
+
+    def estimate(self, labels):
+        """Upper bound on the count of each label, monitored or not."""
+        return self.count_min.estimate(labels)
+
+    def bounds(self, n=None):
+        """count (the estimate), lower and upper bounds of the `n` most frequent labels."""
+        ss = self.space_saving
+        upper = np.minimum(ss.counts, self.count_min.estimate(ss.labels))
+        table = pd.DataFrame({'count': upper, 'lower': np.maximum(ss.counts - ss.errors, 0),
+                              'upper': upper}, index=ss.labels)
+        table = table.loc[CategoryCounts._ranked(table['count']).index]
+        return table if n is None else table.iloc[:n]
+
+    def top(self, n=None):
+        return self.bounds(n)['count']
+
+
+class TopK:
+    """Top-N labels of `column`, overall or for any value of the `by` columns."""
+
+    def __init__(self, column='neighbourhood', by=TOP_BY, capacity=None, width=2048, depth=4, seed=0):
+        """
+        capacity -- None keeps exact counts; otherwise every cell keeps a
+                    HeavyHitters sketch monitoring `capacity` labels
+        width, depth, seed -- Count-Min layout of the sketches
+        """
+        self.column = column
+        self.by = [by] if isinstance(by, str) else list(by)
+        self.capacity = capacity
+        self.sketch_args = (width, depth, seed)
+        self.cells = {}      # tuple of `by` values -> CategoryCounts or HeavyHitters
+        self.totals = {}     # tuple of `by` values -> rows with a label
+
+    @property
+    def exact(self):
+        return self.capacity is None
+
+    def _summary(self):
+        return CategoryCounts() if self.exact else HeavyHitters(self.capacity, *self.sketch_args)
+
+    def _cell_counts(self, chunk):
+        """(cell key, label counts) for every cell present in the chunk."""
+        counts = chunk.groupby(self.by + [self.column], observed=True, sort=False).size()
+        if not self.by:
+            counts.index = counts.index.astype(object)
+            yield (), counts
+            return
+        levels = list(range(len(self.by)))
+        for key, part in counts.groupby(level=levels, sort=False):
+            part = part.droplevel(levels)
+            part.index = part.index.astype(object)
+            yield key if isinstance(key, tuple) else (key,), part
+
+    def update(self, chunk):
+        """Count the rows of a DataFrame chunk."""
+        for key, counts in self._cell_counts(chunk):
+            self.cells.setdefault(key, self._summary()).add_counts(counts)
+            self.totals[key] = self.totals.get(key, 0) + int(counts.sum())
+        return self
+
+    def remove(self, chunk):
+        """Take the rows of a chunk that was added before out again.
+
+        Raises ValueError if a cell sketch has evicted labels.
+        """
+        for key, counts in self._cell_counts(chunk):
+            self.cells[key].remove_counts(counts)
+            self.totals[key] -= int(counts.sum())
+        return self
+
+    def merge(self, other):
+        """Fold in a TopK over the same column, groups and capacity."""
+        if (other.column, other.by, other.capacity) != (self.column, self.by, self.capacity):
+            raise ValueError('can only merge TopK objects with the same column, by and capacity')
+        for key, summary in other.cells.items():
+            self.cells.setdefault(key, self._summary()).merge(summary)
+            self.totals[key] = self.totals.get(key, 0) + other.totals[key]
+        return self
+
+    def _keys(self, where):
+        unknown = set(where) - set(self.by)
+        if unknown:
+            raise KeyError(f'cannot select on {", ".join(sorted(unknown))}; TopK is by {self.by}')
+        pos = [(self.by.index(d), v) for d, v in where.items()]
+        return [k for k in self.cells if all(k[p] == v for p, v in pos)]
+
+    def _merged(self, keys):
+        summary = self._summary()
+        if self.exact and keys:
+            # One group-by over all cells instead of a chain of pairwise adds
+            summary.counts = pd.concat([self.cells[k].counts for k in keys]).groupby(level=0).sum()
+        else:
+            for k in keys:
+                summary.merge(self.cells[k])
+        return summary, sum(self.totals[k] for k in keys)
+
+    def top(self, n=10, other=None, **where):
+        """Counts of the `n` most frequent labels, most frequent first.
+
+        where -- restrict to cells, e.g. neighbourhood_group='Brooklyn'
+        other -- if given, append the rest of the rows under this label
+        Counts are estimates (upper bounds) when the cells are sketches.
+        """
+        summary, total = self._merged(self._keys(where))
+        top = summary.top(n).rename('count')
+        top.index.name = self.column
+        if other is not None:
+            top[other] = max(total - int(top.sum()), 0)
+        return top
+
+    def table(self, n=10, by=None, **where):
+        """Long table of the top `n` labels per value of `by` (a subset of self.by).
+
+        Columns: the `by` values, rank, label and count; with sketches also the
+        lower and upper bounds of each count.
+        """
+        by = [] if by is None else [by] if isinstance(by, str) else list(by)
+        pos = [self.by.index(d) for d in by]
+        groups = {}
+        for k in self._keys(where):
+            groups.setdefault(tuple(k[p] for p in pos), []).append(k)
+        frames = []
+        for sub in sorted(groups):
+            summary, _ = self._merged(groups[sub])
+            top = summary.top(n).to_frame('count') if self.exact else summary.bounds(n)
+            top = top.rename_axis(self.column).reset_index()
+            top.insert(0, 'rank', np.arange(1, len(top) + 1))
+            for d, v in reversed(list(zip(by, sub))):
+                top.insert(0, d, v)
+            frames.append(top)
+        columns = by + ['rank', self.column, 'count'] + ([] if self.exact else ['lower', 'upper'])
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=columns)
+
+
+def build_top_k(data, column='neighbourhood', by=TOP_BY, capacity=None):
+    """Build a TopK from a DataFrame or an iterable of DataFrame chunks."""
+    top = TopK(column, by, capacity)
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+        top.update(chunk)
+    return top
+
+
+def cached_top_k(path, df=None, column='neighbourhood', by=TOP_BY, capacity=None, cache_dir=None):
+    """The TopK for listings file `path`, cached next to the data (built from
+    `df`, or by loading `path`, on a miss)."""
+    by = [by] if isinstance(by, str) else list(by)
+
+    def build():
+        frame = df
+        if frame is None:
+            from listings_loader import load_listings
+            frame = load_listings(path, columns=[column] + by, cache_dir=cache_dir)
+        return build_top_k(frame, column, by, capacity)
+    target = cache_path(path, f'.top-{capacity or "exact"}.pkl', [column] + by, cache_dir)
+    return load_or_build(target, TOPK_VERSION, build)
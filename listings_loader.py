@@ -0,0 +1,258 @@
+"""Typed, chunked loader for Inside Airbnb listing files (AB_NYC_2019 schema).
+
+The first load of a CSV parses it with an explicit dtype schema and writes a
+columnar cache (Parquet, or Feather/pickle when Parquet is unavailable) next to
+the source file. Later loads of the same unchanged file read the cache and skip
+CSV parsing entirely. The cache is keyed on the file's content hash and mtime,
+so editing or replacing the CSV invalidates it.
+
+    python listings_loader.py AB_NYC_2019.csv     # cold vs warm load report
+"""
+
+import hashlib
+import os
+import pickle
+from functools import lru_cache
+
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from perf import rss_mb, timer
+
+# Bump when SCHEMA changes so stale caches are not reused
+SCHEMA_VERSION = 3
+
+# Numerics are downcast where the values allow it. Current listing ids have
+# up to 19 digits, so ids are int64. Counts and prices use the nullable
+# Int types, because a blank cell is missing data rather than a parse error.
+# Text columns use pandas' string dtype, which is also what Parquet reads back.
+SCHEMA = {
+    'id': 'int64',
+    'name': 'str',
+    'host_id': 'int64',
+    'host_name': 'str',
+    'neighbourhood_group': 'category',
+    'neighbourhood': 'category',
+    'latitude': 'float32',
+    'longitude': 'float32',
+    'room_type': 'category',
+    'price': 'Int32',
+    'minimum_nights': 'Int32',
+    'number_of_reviews': 'Int32',
+    'last_review': 'datetime64[ns]',
+    'reviews_per_month': 'float32',
+    'calculated_host_listings_count': 'Int32',
+    'availability_365': 'Int16',
+}
+DATE_COLUMNS = ['last_review']
+ALL_COLUMNS = list(SCHEMA)
+
+# Columns used by the price analysis in Project 1
+ANALYSIS_COLUMNS = ['neighbourhood_group', 'neighbourhood', 'room_type',
+                    'number_of_reviews', 'price']
+
+CACHE_DIR = '.cache'
+
+
+def file_hash(path, block_size=2**20):
+    """blake2b digest of the file contents, read in 1 MB blocks.
+
+    Digests are memoized per (path, size, mtime) so the several cache lookups
+    made for one file in a run only read it once.
+    """
+    st = os.stat(path)
+    return _file_hash(os.path.abspath(path), st.st_size, st.st_mtime_ns, block_size)
+
+
+@lru_cache(maxsize=64)
+def _file_hash(path, size, mtime_ns, block_size):
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cache_key(path, columns=None):
+    """Key identifying one version of `path` loaded with `columns`."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(file_hash(path).encode())
+    h.update(str(os.stat(path).st_mtime_ns).encode())
+    h.update(str(SCHEMA_VERSION).encode())
+    h.update(','.join(columns or ALL_COLUMNS).encode())
+    return h.hexdigest()
+
+
+def cache_path(path, suffix, columns=None, cache_dir=None):
+    """Path of a cache artifact for `path`, e.g. cache_path(csv, '.parquet').
+
+    Other modules use this to persist derived data (aggregates, sketches,
+    indexes) next to the data cache under the same key.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(cache_dir, f'{stem}-{cache_key(path, columns)}{suffix}')
+
+
+def save_versioned(obj, path, version):
+    """Pickle (version, obj) to `path`, replacing it atomically."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump((version, obj), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def load_versioned(path, version):
+    """The object save_versioned() wrote; ValueError if it holds another version."""
+    with open(path, 'rb') as f:
+        saved, obj = pickle.load(f)
+    if saved != version:
+        raise ValueError(f'{path} holds version {saved}, expected {version}')
+    return obj
+
+
+def load_or_build(path, version, build):
+    """The object saved at `path` with `version`, or build() saved there when
+    the file is missing, stale or unreadable."""
+    if os.path.exists(path):
+        try:
+            return load_versioned(path, version)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            pass
+    obj = build()
+    save_versioned(obj, path, version)
+    return obj
+
+
+def _dtypes(columns):
+    return {c: SCHEMA[c] for c in columns if c in SCHEMA and c not in DATE_COLUMNS}
+
+
+def iter_listings(path, columns=None, chunksize=100_000):
+    """Yield typed DataFrame chunks of `path` with at most `chunksize` rows."""
+    columns = columns or ALL_COLUMNS
+    dates = [c for c in DATE_COLUMNS if c in columns]
+    reader = pd.read_csv(path, usecols=columns, dtype=_dtypes(columns),
+                         parse_dates=dates, chunksize=chunksize)
+    with reader:
+        for chunk in reader:
+            yield chunk[columns]
+
+
+def concat_chunks(chunks):
+    """Concatenate typed chunks, unioning categoricals instead of falling back
+    to object dtype when the chunks saw different categories."""
+    chunks = list(chunks)
+    if not chunks:
+        return pd.DataFrame()
+    out = pd.concat(chunks, ignore_index=True)
+    for col in chunks[0].columns:
+        if isinstance(chunks[0][col].dtype, pd.CategoricalDtype):
+            out[col] = union_categoricals([c[col] for c in chunks], sort_categories=True)
+    return out
+
+
+def read_listings_csv(path, columns=None, chunksize=None):
+    """Parse `path` with the dtype schema, optionally in bounded chunks."""
+    columns = columns or ALL_COLUMNS
+    if chunksize:
+        return concat_chunks(iter_listings(path, columns, chunksize))
+    dates = [c for c in DATE_COLUMNS if c in columns]
+    df = pd.read_csv(path, usecols=columns, dtype=_dtypes(columns),
+                     parse_dates=dates)
+    return df[columns]
+
+
+def _write_cache(df, target):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = target + '.tmp'
+    try:
+        df.to_parquet(tmp, index=False)
+    except ImportError:
+        try:
+            df.to_feather(tmp)
+        except ImportError:
+            with open(tmp, 'wb') as f:
+                pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, target)
+
+
+def _read_cache(target):
+    # Sniff the format so a cache written with a fallback still loads
+    with open(target, 'rb') as f:
+        magic = f.read(6)
+    if magic[:4] == b'PAR1':
+        return pd.read_parquet(target)
+    if magic == b'ARROW1':
+        return pd.read_feather(target)
+    with open(target, 'rb') as f:
+        return pickle.load(f)
+
+
+def load_listings(path='AB_NYC_2019.csv', columns=None, use_cache=True,
+                  cache_dir=None, chunksize=None, verbose=False):
+    """Load a listings file with the typed schema, going through the cache.
+
+    columns   -- subset of columns to read, e.g. ANALYSIS_COLUMNS (default all)
+    use_cache -- read/write the columnar cache next to the source file
+    chunksize -- parse the CSV in chunks of this many rows on a cold load
+    verbose   -- print load time, source and resident memory
+    """
+    df, report = load_listings_report(path, columns, use_cache, cache_dir, chunksize)
+    if verbose:
+        print(format_report(report))
+    return df
+
+
+def load_listings_report(path='AB_NYC_2019.csv', columns=None, use_cache=True,
+                         cache_dir=None, chunksize=None):
+    """Same as load_listings but also returns a dict describing the load."""
+    columns = list(columns or ALL_COLUMNS)
+    rss_before = rss_mb()
+    with timer() as t:
+        target = cache_path(path, '.parquet', columns, cache_dir) if use_cache else None
+        if target and os.path.exists(target):
+            df, source = _read_cache(target), 'cache'
+        else:
+            df, source = read_listings_csv(path, columns, chunksize), 'csv'
+            if target:
+                _write_cache(df, target)
+        # Same dtypes whichever way the frame was read
+        df = df.astype({c: SCHEMA[c] for c in columns if c in SCHEMA})
+    report = {
+        'path': path,
+        'source': source,
+        'rows': len(df),
+        'columns': len(df.columns),
+        'seconds': t['seconds'],
+        'rss_mb': rss_mb(),
+        'rss_delta_mb': rss_mb() - rss_before,
+        'frame_mb': df.memory_usage(deep=True).sum() / 2**20,
+    }
+    return df, report
+
+
+def format_report(report):
+    return ('{path}: {rows} rows x {columns} cols from {source} in {seconds:.3f}s, '
+            'frame {frame_mb:.1f} MB, RSS {rss_mb:.1f} MB (+{rss_delta_mb:.1f})'
+            .format(**report))
+
+
+def clear_cache(path, columns=None, cache_dir=None):
+    """Remove the cached copy of `path`, if any."""
+    target = cache_path(path, '.parquet', columns, cache_dir)
+    if os.path.exists(target):
+        os.remove(target)
+
+
+if __name__ == '__main__':
+    import sys
+
+    src = sys.argv[1] if len(sys.argv) > 1 else 'AB_NYC_2019.csv'
+    for cols in (ALL_COLUMNS, ANALYSIS_COLUMNS):
+        clear_cache(src, cols)
+        for label in ('cold', 'warm'):
+            _, rep = load_listings_report(src, cols)
+            print(f'{label}:', format_report(rep))
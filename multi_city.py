@@ -0,0 +1,155 @@
+"""Run the Project 1 load -> clean -> summarize -> aggregate steps over many
+Inside Airbnb listing files in parallel.
+
+Each file is handled by one worker process, which returns its mergeable
+SummaryEngine, AggCube and top-neighbourhood sketch (TopK); the parent
+merges them into combined tables and also keeps the per-file summary
+tables. Every run reports per-file and total
+wall time; --scaling repeats the run at 1, 2, 4, ... workers and reports the
+speedup and efficiency against the single-process run.
+
+    python multi_city.py 'snapshots/*.csv' --workers 8
+    python multi_city.py snapshots/ --scaling          # 1, 2, 4, ... workers
+"""
+
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from agg_cube import AggCube
+from heavy_hitters import TopK
+from listings_loader import ANALYSIS_COLUMNS, iter_listings, load_listings
+from summary_stats import SummaryEngine
+
+SUMMARY_VARIABLES = ['neighbourhood_group', 'neighbourhood', 'room_type', 'number_of_reviews', 'price']
+# Neighbourhoods monitored per (group, room type) cell; the number of distinct
+# neighbourhoods grows with every city, so they are sketched, not counted
+TOP_CAPACITY = 1000
+
+
+def find_listing_files(source):
+    """Listing CSVs in a directory, or the files matching a glob pattern."""
+    if os.path.isdir(source):
+        paths = glob.glob(os.path.join(source, '*.csv')) + glob.glob(os.path.join(source, '*.csv.gz'))
+    else:
+        paths = glob.glob(source)
+    return sorted(paths)
+
+
+def analyze_file(path, chunksize=None):
+    """Load, clean and aggregate one listings file (runs in a worker process).
+
+    Rows missing any analysis column are dropped, as df.dropna() would for
+    those columns. With `chunksize` the file is streamed instead of loaded
+    through the typed cache.
+    """
+    start = time.perf_counter()
+    summary = SummaryEngine(SUMMARY_VARIABLES)
+    cube = AggCube()
+    top = TopK(capacity=TOP_CAPACITY)
+    rows = kept = 0
+    chunks = (iter_listings(path, ANALYSIS_COLUMNS, chunksize) if chunksize
+              else [load_listings(path, columns=ANALYSIS_COLUMNS)])
+    for chunk in chunks:
+        rows += len(chunk)
+        chunk = chunk.dropna(subset=ANALYSIS_COLUMNS)
+        kept += len(chunk)
+        summary.update(chunk)
+        cube.update(chunk)
+        top.update(chunk)
+    return {'path': path, 'rows': rows, 'kept': kept, 'summary': summary, 'cube': cube,
+            'top': top, 'seconds': time.perf_counter() - start}
+
+
+def run(paths, workers=None, chunksize=None):
+    """Analyze every file in `paths` across `workers` processes and merge the results."""
+    workers = workers or os.cpu_count()
+    start = time.perf_counter()
+    if workers == 1:
+        results = [analyze_file(p, chunksize) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(analyze_file, paths, [chunksize] * len(paths)))
+    wall = time.perf_counter() - start
+
+    file_summaries = {r['path']: r['summary'].table() for r in results}
+    summary = SummaryEngine(SUMMARY_VARIABLES)
+    cube = AggCube()
+    top = TopK(capacity=TOP_CAPACITY)
+    for r in results:
+        summary.merge(r['summary'])
+        cube.merge(r['cube'])
+        top.merge(r['top'])
+
+    per_file = pd.DataFrame([{k: r[k] for k in ('path', 'rows', 'kept', 'seconds')} for r in results])
+    busy = per_file['seconds'].sum()
+    # concurrency is the average number of files in flight; per-file times
+    # include contention, so true speedup comes from scaling()
+    timing = {'workers': workers, 'files': len(paths), 'wall_seconds': wall,
+              'file_seconds': busy, 'concurrency': busy / wall if wall else float('nan')}
+    return {
+        'summary': summary.table(),
+        'file_summaries': pd.concat(file_summaries, names=['path', 'variable']) if results else pd.DataFrame(),
+        'cube': cube,
+        'top_neighbourhoods': top,
+        'per_file': per_file,
+        'timing': timing,
+    }
+
+
+def scaling(paths, chunksize=None, max_workers=None):
+    """Wall time and efficiency of run() at 1, 2, 4, ... workers.
+
+    An untimed run first writes any missing typed caches, so every timed run
+    starts from the same cache state.
+    """
+    max_workers = max_workers or os.cpu_count()
+    counts, w = [], 1
+    while w < max_workers:
+        counts.append(w)
+        w *= 2
+    counts.append(max_workers)
+    run(paths, max_workers, chunksize)
+    table = pd.DataFrame([run(paths, w, chunksize)['timing'] for w in counts]).set_index('workers')
+    table['speedup'] = table['wall_seconds'].iloc[0] / table['wall_seconds']
+    table['efficiency'] = table['speedup'] / table.index
+    return table
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('source', help='directory of listing CSVs or a glob pattern')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=None, help='stream files in chunks of this many rows')
+    parser.add_argument('--scaling', action='store_true', help='time 1, 2, 4, ... workers')
+    parser.add_argument('--out', help='write the merged summary table to this CSV')
+    args = parser.parse_args(argv)
+
+    paths = find_listing_files(args.source)
+    if not paths:
+        parser.error(f'no listing files found for {args.source!r}')
+    if args.scaling:
+        print(scaling(paths, args.chunksize, args.workers).to_string(float_format='{:.3f}'.format))
+        return
+
+    result = run(paths, args.workers, args.chunksize)
+    with pd.option_context('display.width', 140, 'display.max_columns', 20):
+        print(result['per_file'].to_string(index=False, float_format='{:.3f}'.format))
+        print()
+        print(result['summary'])
+        print()
+        print(result['top_neighbourhoods'].table(10).to_string(index=False))
+        print()
+    t = result['timing']
+    print(f"{t['files']} files on {t['workers']} workers: wall {t['wall_seconds']:.2f}s, "
+          f"summed file time {t['file_seconds']:.2f}s, concurrency {t['concurrency']:.2f}")
+    if args.out:
+        result['summary'].to_csv(args.out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Vectorized IQR (Tukey fence) outlier detection for several columns at once.
+
+All quartiles come from one batched quantile call (per group when `by` is
+given), and the result holds one packed bitset per column (1 bit per row)
+instead of boolean-indexed copies of the frame. Rows are only materialized on
+request with OutlierMasks.rows().
+
+    outliers = find_outliers(df, ['price', 'number_of_reviews'])
+    outliers.counts()                 # price 2972, number_of_reviews 6021
+    outliers.rows(df, 'price')        # same frame as the notebook's price_outliers
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def iqr_fences(df, columns, by=None, k=1.5):
+    """Q1, Q3, IQR and the lower/upper fences for each column.
+
+    Without `by` the result is indexed by column. With `by` (a column name or
+    list, e.g. ['neighbourhood_group', 'room_type']) it is indexed by column
+    followed by the group keys, groups in groupby order, so that
+    `fences.loc['price']` is the per-group table for price.
+    """
+    columns = list(columns)
+    if by is None:
+        q = df[columns].quantile([0.25, 0.75])
+        q1, q3 = q.loc[0.25], q.loc[0.75]
+    else:
+        q = df.groupby(by, observed=True)[columns].quantile([0.25, 0.75])
+        q1, q3 = q.xs(0.25, level=-1), q.xs(0.75, level=-1)
+    iqr = q3 - q1
+    parts = {'q1': q1, 'q3': q3, 'iqr': iqr, 'lower': q1 - k * iqr, 'upper': q3 + k * iqr}
+    if by is None:
+        fences = pd.DataFrame(parts)
+        fences.index.name = 'column'
+        return fences
+    return pd.concat({col: pd.DataFrame({name: part[col] for name, part in parts.items()})
+                      for col in columns}, names=['column'])
+
+
+def fences_from_sketches(sketches, k=1.5):
+    """iqr_fences() layout computed from QuantileSketch objects keyed by column."""
+    rows = {}
+    for col, sketch in sketches.items():
+        q1, q3 = sketch.quantile([0.25, 0.75])
+        rows[col] = {'q1': q1, 'q3': q3, 'iqr': q3 - q1,
+                     'lower': q1 - k * (q3 - q1), 'upper': q3 + k * (q3 - q1)}
+    fences = pd.DataFrame.from_dict(rows, orient='index')
+    fences.index.name = 'column'
+    return fences
+
+
+class OutlierMasks:
+    """Per-column outlier bitsets over the rows of one frame."""
+
+    def __init__(self, bits, n_rows, fences):
+        self.bits = bits
+        self.n_rows = n_rows
+        self.fences = fences
+
+    @property
+    def columns(self):
+        return list(self.bits)
+
+    def mask(self, column):
+        """Boolean array, True where the row is an outlier in `column`."""
+        return np.unpackbits(self.bits[column], count=self.n_rows).astype(bool)
+
+    def indices(self, column):
+        """Positional row indices of the outliers in `column`."""
+        return np.flatnonzero(self.mask(column))
+
+    def any(self):
+        """Boolean array, True where the row is an outlier in any column."""
+        packed = np.bitwise_or.reduce([self.bits[c] for c in self.bits])
+        return np.unpackbits(packed, count=self.n_rows).astype(bool)
+
+    def counts(self):
+        return pd.Series({c: int(np.unpackbits(b, count=self.n_rows).sum())
+                          for c, b in self.bits.items()}, name='outliers')
+
+    def rows(self, df, column):
+        """The outlier rows of `df` for `column` (df must be the frame the masks were built on)."""
+        return df.iloc[self.indices(column)]
+
+
+def find_outliers(df, columns, by=None, k=1.5, fences=None):
+    """Flag values outside [Q1 - k*IQR, Q3 + k*IQR] for every column in `columns`.
+
+    fences -- precomputed result of iqr_fences or fences_from_sketches;
+              computed from `df` when omitted
+    """
+    columns = list(columns)
+    if fences is None:
+        fences = iqr_fences(df, columns, by, k)
+    if by is None:
+        codes = np.zeros(len(df), dtype=np.intp)
+    else:
+        # ngroup() numbers groups in the same sorted order as iqr_fences
+        codes = df.groupby(by, observed=True).ngroup().to_numpy()
+    valid = codes >= 0
+
+    bits = {}
+    for col in columns:
+        lower = np.atleast_1d(fences.loc[col, 'lower']).astype(float)
+        upper = np.atleast_1d(fences.loc[col, 'upper']).astype(float)
+        values = df[col].to_numpy(dtype=float)
+        safe = np.where(valid, codes, 0)
+        mask = ((values < lower[safe]) | (values > upper[safe])) & valid
+        bits[col] = np.packbits(mask)
+    return OutlierMasks(bits, len(df), fences)
+
+
+class OutlierIndex:
+    """Listing ids per distinct value of each column, kept up to date under
+    inserts and removals so outlier sets follow a changing snapshot.
+
+    Each value holds a sorted int64 array of ids (8 bytes per listing rather
+    than a Python int in a set); ids are unique, as the snapshot key is.
+    Adding or removing rows inserts or deletes the changed ids by binary
+    search in the arrays of the values they touch. outliers() only visits the
+    distinct values outside the fences (a few hundred for price), never the
+    rows inside them.
+    """
+
+    def __init__(self, columns, key='id'):
+        self.columns = list(columns)
+        self.key = key
+        self.ids = {c: {} for c in self.columns}
+
+    def _groups(self, rows, column):
+        ids = rows[self.key].to_numpy(dtype=np.int64)
+        for value, idx in pd.Series(ids).groupby(rows[column].to_numpy(dtype=float)).indices.items():
+            yield value, np.sort(ids[idx])
+
+    def update(self, rows):
+        for c in self.columns:
+            buckets = self.ids[c]
+            for value, ids in self._groups(rows, c):
+                bucket = buckets.get(value)
+                buckets[value] = ids if bucket is None else np.insert(bucket, np.searchsorted(bucket, ids), ids)
+        return self
+
+    def remove(self, rows):
+        for c in self.columns:
+            buckets = self.ids[c]
+            for value, ids in self._groups(rows, c):
+                bucket = buckets.get(value)
+                if bucket is None:
+                    continue
+                pos = np.minimum(np.searchsorted(bucket, ids), bucket.size - 1)
+                bucket = np.delete(bucket, pos[bucket[pos] == ids])
+                if bucket.size:
+                    buckets[value] = bucket
+                else:
+                    del buckets[value]
+        return self
+
+    def _outside(self, c, fences):
+        lower, upper = fences.loc[c, 'lower'], fences.loc[c, 'upper']
+        return [b for v, b in self.ids[c].items() if v < lower or v > upper]
+
+    def outliers(self, fences):
+        """Frame of (column, id) for every value outside the fences, sorted."""
+        parts = []
+        for c in self.columns:
+            buckets = self._outside(c, fences)
+            ids = np.sort(np.concatenate(buckets)) if buckets else np.zeros(0, dtype=np.int64)
+            parts.append(pd.DataFrame({'column': c, 'id': ids}))
+        return pd.concat(parts, ignore_index=True)
+
+    def counts(self, fences):
+        return pd.Series({c: sum(b.size for b in self._outside(c, fences)) for c in self.columns},
+                         name='outliers')
@@ -0,0 +1,62 @@
+"""Small timing and memory helpers shared by the loaders and benchmarks."""
+
+import os
+import resource
+import sys
+import time
+from contextlib import contextmanager
+
+
+def rss_mb():
+    """Current resident set size of this process in MB.
+
+    Uses psutil when it is installed, otherwise /proc/self/statm, and finally
+    falls back to the peak RSS reported by getrusage.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (since reset_peak_rss())."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except (OSError, ValueError, IndexError):
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def reset_peak_rss():
+    """Restart peak_rss_mb() from the current RSS, so a stage can be measured
+    on its own. Only Linux supports this; returns False elsewhere."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+@contextmanager
+def timer():
+    """Context manager yielding a dict that receives `seconds` on exit."""
+    out = {}
+    start = time.perf_counter()
+    try:
+        yield out
+    finally:
+        out['seconds'] = time.perf_counter() - start
@@ -0,0 +1,207 @@
+"""Out-of-core run of the Project 1 report tables.
+
+stream_report_tables() reads the listings CSV in chunks and feeds every chunk
+through the cleaning checks and aggregations of `Project 1 .py`, keeping only
+mergeable accumulators. Nothing proportional to the file is held except the
+set of row digests used for duplicate detection (8 bytes per distinct row).
+price and number_of_reviews are integer columns, so their quantile sketches
+keep exact value counts (compression=None) and every table equals the
+in-memory run; memory for them grows with the distinct values, not the rows.
+
+The CSV is read at most twice:
+
+1. shape, missing values, complete rows, duplicates, the summary table, the
+   aggregation cube and the price/review quantile sketches
+2. rows at or below the 95th price percentile (known only after pass 1) for
+   the filtered boxplot statistics; outlier counts are also taken here if the
+   sketches had to compress (with a numeric `compression`; they are read off
+   the exact sketches otherwise)
+
+report_tables() computes the same tables from an in-memory frame, and
+tables_equal() checks the two runs against each other.
+
+    python pipeline.py AB_NYC_2019.csv 50000      # stream, compare with in-memory
+"""
+
+import numpy as np
+import pandas as pd
+
+from agg_cube import AggCube, build_cube
+from duplicates import DuplicateDetector
+from listings_loader import ALL_COLUMNS, iter_listings
+from outliers import fences_from_sketches, find_outliers
+from quantile_sketch import QuantileSketch
+from summary_stats import SummaryEngine, summarize
+
+SUMMARY_VARIABLES = ['neighbourhood_group', 'neighbourhood', 'room_type', 'number_of_reviews', 'price']
+OUTLIER_COLUMNS = ['price', 'number_of_reviews']
+BOXPLOT_GROUPS = ['neighbourhood_group', 'room_type']
+PRICE_LIMIT_Q = 0.95
+
+
+class GroupQuantiles:
+    """One QuantileSketch of `column` per value of `by`."""
+
+    def __init__(self, by, column, compression=None):
+        self.by = by
+        self.column = column
+        self.compression = compression
+        self.sketches = {}
+
+    def update(self, chunk):
+        values = chunk[self.column].to_numpy()
+        for key, idx in chunk.groupby(self.by, observed=True).indices.items():
+            self.sketches.setdefault(key, QuantileSketch(self.compression)).update(values[idx])
+        return self
+
+    def table(self, q=(0.25, 0.5, 0.75)):
+        keys = sorted(self.sketches)
+        out = pd.DataFrame([self.sketches[k].quantile(list(q)) for k in keys],
+                           index=pd.Index(keys, name=self.by), columns=list(q))
+        out['count'] = [int(self.sketches[k].count) for k in keys]
+        return out
+
+
+def cube_tables(cube):
+    """The countplot, fraction and mean-price tables, read off an AggCube.
+
+    The mean-price table uses a normal-approximation interval, so it is named
+    apart from the report's bootstrap `mean_price` table.
+    """
+    return {
+        'group_counts': cube.counts('neighbourhood_group'),
+        'room_counts': cube.counts('room_type'),
+        'neighbourhood_counts': cube.counts('neighbourhood'),
+        'frac_matrix_norm': cube.fraction_matrix('neighbourhood_group', 'room_type'),
+        'mean_price_normal': cube.mean_ci(['neighbourhood_group', 'room_type'], 'price'),
+    }
+
+
+def stream_report_tables(path, chunksize=100_000, columns=None, compression=None):
+    """Report tables for the CSV at `path`, reading `chunksize` rows at a time.
+
+    A numeric `compression` bounds the quantile sketches for columns with many
+    distinct values, at the cost of approximate quantile tables.
+    """
+    columns = columns or ALL_COLUMNS
+    n_rows = complete_rows = 0
+    null_counts = pd.Series(0, index=columns, dtype='int64')
+    duplicates = DuplicateDetector()
+    summary = SummaryEngine(SUMMARY_VARIABLES, compression)
+    cube = AggCube()
+
+    for chunk in iter_listings(path, columns, chunksize):
+        n_rows += len(chunk)
+        nulls = chunk.isnull()
+        null_counts += nulls.sum()
+        complete_rows += int((~nulls.any(axis=1)).sum())
+
+        duplicates.update(chunk)
+        summary.update(chunk)
+        cube.update(chunk)
+
+    sketches = {c: summary.accumulators[c].sketch for c in OUTLIER_COLUMNS}
+    upper_limit = sketches['price'].quantile(PRICE_LIMIT_Q)
+    fences = fences_from_sketches(sketches)
+    exact = all(s.exact for s in sketches.values())
+    outlier_counts = pd.Series({c: int(sketches[c].count_outside(fences.loc[c, 'lower'],
+                                                                 fences.loc[c, 'upper']))
+                                for c in OUTLIER_COLUMNS}, name='outliers')
+
+    filtered = [GroupQuantiles(by, 'price', compression) for by in BOXPLOT_GROUPS]
+    counted = pd.Series(0, index=OUTLIER_COLUMNS, name='outliers')
+    for chunk in iter_listings(path, BOXPLOT_GROUPS + OUTLIER_COLUMNS, chunksize):
+        kept = chunk[chunk['price'] <= upper_limit]
+        for g in filtered:
+            g.update(kept)
+        if not exact:
+            counted += find_outliers(chunk, OUTLIER_COLUMNS, fences=fences).counts()
+    if not exact:
+        outlier_counts = counted
+
+    tables = {
+        'shape': (n_rows, len(columns)),
+        'missing_values': (null_counts > 0).to_frame('Has Missing Values'),
+        'num_null': null_counts.to_frame('Num of Missing Value'),
+        'complete_rows': complete_rows,
+        'duplicates': duplicates.count,
+        'summary': summary.table(),
+        'outlier_fences': fences,
+        'outlier_counts': outlier_counts,
+        'upper_limit': upper_limit,
+    }
+    tables.update(cube_tables(cube))
+    for by, g in zip(BOXPLOT_GROUPS, filtered):
+        tables[f'filtered_price_by_{by}'] = g.table()
+    return tables
+
+
+def report_tables(df):
+    """The same tables computed from a frame held in memory."""
+    nulls = df.isnull()
+    upper_limit = df['price'].quantile(PRICE_LIMIT_Q)
+    filtered_df = df[df['price'] <= upper_limit]
+    outliers = find_outliers(df, OUTLIER_COLUMNS)
+    tables = {
+        'shape': df.shape,
+        'missing_values': nulls.any(axis=0).to_frame('Has Missing Values'),
+        'num_null': nulls.sum().to_frame('Num of Missing Value'),
+        'complete_rows': int((~nulls.any(axis=1)).sum()),
+        'duplicates': int(df.duplicated().sum()),
+        'summary': summarize(df, SUMMARY_VARIABLES, compression=None),
+        'outlier_fences': outliers.fences,
+        'outlier_counts': outliers.counts(),
+        'upper_limit': upper_limit,
+    }
+    tables.update(cube_tables(build_cube(df)))
+    for by in BOXPLOT_GROUPS:
+        grouped = filtered_df.groupby(by, observed=True)['price']
+        table = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+        table.index = table.index.astype(object)
+        table['count'] = grouped.size().to_numpy()
+        tables[f'filtered_price_by_{by}'] = table
+    return tables
+
+
+def tables_equal(a, b, rtol=1e-9):
+    """Names of the tables that differ between two runs (empty when identical).
+
+    Floating point aggregates are compared with relative tolerance `rtol`,
+    which only absorbs summation-order rounding.
+    """
+    differ = []
+    for name in a:
+        x, y = a[name], b.get(name)
+        if isinstance(x, (pd.DataFrame, pd.Series)):
+            try:
+                kwargs = {'check_dtype': False, 'check_names': False, 'rtol': rtol}
+                if isinstance(x, pd.DataFrame):
+                    pd.testing.assert_frame_equal(x, y, check_index_type=False,
+                                                  check_column_type=False, **kwargs)
+                else:
+                    pd.testing.assert_series_equal(x, y, check_index_type=False, **kwargs)
+            except (AssertionError, TypeError):
+                differ.append(name)
+        elif isinstance(x, float):
+            if not np.isclose(x, y, rtol=rtol):
+                differ.append(name)
+        elif x != y:
+            differ.append(name)
+    return differ
+
+
+if __name__ == '__main__':
+    import sys
+
+    from listings_loader import load_listings
+    from perf import peak_rss_mb, timer
+
+    src = sys.argv[1] if len(sys.argv) > 1 else 'AB_NYC_2019.csv'
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    with timer() as t:
+        streamed = stream_report_tables(src, size)
+    print(f'streamed in {t["seconds"]:.2f}s (chunks of {size:,} rows), peak RSS {peak_rss_mb():.0f} MB')
+    with timer() as t:
+        in_memory = report_tables(load_listings(src, use_cache=False))
+    print(f'in-memory in {t["seconds"]:.2f}s, peak RSS {peak_rss_mb():.0f} MB')
+    print('tables that differ:', tables_equal(in_memory, streamed) or 'none')
@@ -0,0 +1,201 @@
+"""Mergeable quantile sketch.
+
+QuantileSketch keeps a sorted list of (mean, weight) centroids. While the
+number of distinct values seen stays at or below `compression` every centroid
+is a single distinct value with its exact count, and quantile() reproduces
+pandas' default (linear interpolation) quantiles exactly. Once there are more
+distinct values the centroids are merged with a t-digest style arcsine scale,
+which keeps about compression/2 centroids and concentrates resolution in the
+tails. Quantiles are then approximate: a centroid around the median spans at
+most pi/compression of the ranks, so the rank error is about
+pi / (2 * compression) of the count (0.16% at the default 1000) and smaller
+near q=0 and q=1. QuantileSketch.for_rank_error picks the compression for a
+target error. With compression=None centroids are never merged: the sketch
+holds exact value counts, which stays small for integer columns such as
+price with a bounded number of distinct values.
+
+Sketches built on separate chunks or files can be merged, and merging gives
+the same result as a single sketch over the combined data while both are exact.
+They serialize to a few KB with to_bytes(), and cached_sketches() keeps them
+next to the data cache so quantile filters are O(1) on re-runs:
+
+    sketches = cached_sketches('AB_NYC_2019.csv', ['price'], df)
+    upper_limit = sketches['price'].quantile(0.95)
+"""
+
+import io
+
+import numpy as np
+
+# Bump when the serialized layout changes
+SKETCH_VERSION = 1
+
+
+class QuantileSketch:
+
+    def __init__(self, compression=1000):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+        self.exact = True
+
+    @classmethod
+    def for_rank_error(cls, error):
+        """Sketch whose approximate quantiles are within `error` (a fraction of
+        the count, e.g. 0.001) of the true rank."""
+        return cls(int(np.ceil(np.pi / (2 * error))))
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def update(self, values):
+        """Add an array of values; NaNs are ignored."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        uniq, counts = np.unique(values, return_counts=True)
+        self.min = min(self.min, uniq[0])
+        self.max = max(self.max, uniq[-1])
+        self._absorb(uniq, counts.astype(float), exact=True)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one (in place) and return self."""
+        if other.weights.size:
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self._absorb(other.means, other.weights, exact=other.exact)
+        return self
+
+    def remove(self, values):
+        """Take previously added values out again; NaNs are ignored.
+
+        Only an exact sketch still knows its individual values, so this raises
+        ValueError once the sketch has compressed (rebuild it instead).
+        """
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        if not self.exact:
+            raise ValueError('cannot remove values from an approximate sketch')
+        uniq, counts = np.unique(values, return_counts=True)
+        idx = np.searchsorted(self.means, uniq)
+        found = idx < self.means.size
+        found[found] = self.means[idx[found]] == uniq[found]
+        if not found.all() or (self.weights[idx] < counts).any():
+            raise ValueError('removing values that are not in the sketch')
+        w = self.weights.copy()
+        w[idx] -= counts
+        keep = w > 0
+        self.means, self.weights = self.means[keep], w[keep]
+        self.min = self.means[0] if self.means.size else np.inf
+        self.max = self.means[-1] if self.means.size else -np.inf
+        return self
+
+    def _absorb(self, means, weights, exact):
+        m = np.concatenate([self.means, means])
+        w = np.concatenate([self.weights, weights])
+        m, first = np.unique(m, return_inverse=True)
+        w = np.bincount(first, weights=w)
+        self.exact = self.exact and exact
+        if self.compression is not None and m.size > self.compression:
+            m, w = self._compress(m, w)
+            self.exact = False
+        self.means, self.weights = m, w
+
+    def _compress(self, m, w):
+        # Centroids whose mid-rank falls into the same unit of the arcsine
+        # scale k(q) = compression / (2 pi) * asin(2q - 1) are merged
+        cw = np.cumsum(w)
+        q = (cw - w / 2) / cw[-1]
+        k = np.floor(self.compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(k)) + 1])
+        new_w = np.add.reduceat(w, starts)
+        new_m = np.add.reduceat(m * w, starts) / new_w
+        return new_m, new_w
+
+    def quantile(self, q):
+        """Quantile(s) at q in [0, 1], using pandas' linear interpolation."""
+        q = np.asarray(q, dtype=float)
+        n = self.count
+        if n == 0:
+            return np.full(q.shape, np.nan) if q.ndim else np.nan
+        rank = (n - 1) * q
+        if self.exact:
+            cw = np.cumsum(self.weights)
+            lo = np.floor(rank)
+            hi = np.minimum(lo + 1, n - 1)
+            v_lo = self.means[np.searchsorted(cw, lo, side='right')]
+            v_hi = self.means[np.searchsorted(cw, hi, side='right')]
+            out = v_lo + (rank - lo) * (v_hi - v_lo)
+        else:
+            # Interpolate between centroid centres, pinned to the exact extremes
+            cw = np.cumsum(self.weights)
+            centres = np.concatenate([[0], cw - self.weights / 2, [n]])
+            means = np.concatenate([[self.min], self.means, [self.max]])
+            out = np.interp(rank + 0.5, centres, means)
+            out = np.clip(out, self.min, self.max)
+        return out if q.ndim else float(out)
+
+    def count_outside(self, lower, upper):
+        """Number of values strictly below `lower` or above `upper`.
+
+        Exact while the sketch is exact; otherwise an estimate from the centroids.
+        """
+        outside = (self.means < lower) | (self.means > upper)
+        return float(self.weights[outside].sum())
+
+    def to_bytes(self):
+        header = np.array([SKETCH_VERSION, self.compression or 0, self.min, self.max, self.exact], dtype=float)
+        buf = io.BytesIO()
+        np.save(buf, np.concatenate([header, self.means, self.weights]))
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        arr = np.load(io.BytesIO(data))
+        version, compression, lo, hi, exact = arr[:5]
+        if version != SKETCH_VERSION:
+            raise ValueError(f'sketch version {version:.0f}, expected {SKETCH_VERSION}')
+        sketch = cls(int(compression) or None)
+        sketch.min, sketch.max, sketch.exact = lo, hi, bool(exact)
+        sketch.means, sketch.weights = np.split(arr[5:], 2)
+        return sketch
+
+    def __len__(self):
+        return self.means.size
+
+    def __repr__(self):
+        mode = 'exact' if self.exact else 'approx'
+        return f'QuantileSketch(count={self.count:.0f}, centroids={len(self)}, {mode})'
+
+
+def sketch_columns(data, columns, compression=1000):
+    """QuantileSketch per column of a DataFrame or an iterable of chunks."""
+    import pandas as pd
+
+    sketches = {c: QuantileSketch(compression) for c in columns}
+    for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+        for c in columns:
+            sketches[c].update(chunk[c].to_numpy())
+    return sketches
+
+
+def cached_sketches(path, columns=('price', 'number_of_reviews'), df=None,
+                    compression=1000, cache_dir=None):
+    """Sketches of `columns` for listings file `path`, cached next to the data
+    (built from `df`, or by streaming `path` in chunks, on a miss)."""
+    from listings_loader import cache_path, iter_listings, load_or_build
+
+    columns = list(columns)
+
+    def build():
+        source = df if df is not None else iter_listings(path, columns)
+        return sketch_columns(source, columns, compression)
+    target = cache_path(path, f'.sketch-{compression or "exact"}.pkl', columns, cache_dir)
+    return load_or_build(target, SKETCH_VERSION, build)
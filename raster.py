@@ -0,0 +1,135 @@
+"""Rasterized aggregation for scatter-style plots.
+
+Raster bins (x, y) points into a fixed pixel grid and keeps the count (and
+optionally the sum of a value) per cell, so a figure ships width x height
+numbers instead of one JSON record per listing. Rasters fill chunk by chunk
+and merge. For plots that need individual points, stratified_sample keeps at
+most a fixed number of rows per group, which bounds the output the same way.
+
+    r = Raster((0, 630), (0, 10000), width=600, height=400)
+    r.update(df['number_of_reviews'], df['price'])
+    fig = raster_figure(r)        # embeds a PNG of the grid, a few KB
+"""
+
+import base64
+import io
+
+import numpy as np
+
+
+class Raster:
+
+    def __init__(self, x_range, y_range, width=600, height=400):
+        self.x_range = tuple(map(float, x_range))
+        self.y_range = tuple(map(float, y_range))
+        self.width = width
+        self.height = height
+        self.count = np.zeros((height, width), dtype=np.int64)
+        self.sum = np.zeros((height, width))
+
+    def _cells(self, x, y):
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        (x0, x1), (y0, y1) = self.x_range, self.y_range
+        with np.errstate(invalid='ignore'):
+            col = np.floor((x - x0) / (x1 - x0) * self.width).astype(np.int64)
+            row = np.floor((y - y0) / (y1 - y0) * self.height).astype(np.int64)
+        # Points exactly on the upper edge go into the last pixel
+        col[x == x1] = self.width - 1
+        row[y == y1] = self.height - 1
+        keep = (col >= 0) & (col < self.width) & (row >= 0) & (row < self.height)
+        return row[keep] * self.width + col[keep], keep
+
+    def update(self, x, y, values=None):
+        """Add points; points outside the ranges are dropped, NaNs included."""
+        flat, keep = self._cells(x, y)
+        size = self.width * self.height
+        self.count += np.bincount(flat, minlength=size).reshape(self.count.shape)
+        if values is not None:
+            values = np.asarray(values, dtype=float)[keep]
+            self.sum += np.bincount(flat, weights=values, minlength=size).reshape(self.sum.shape)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.sum += other.sum
+        return self
+
+    def mean(self):
+        """Mean of the aggregated value per pixel (NaN where empty)."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.sum / self.count, np.nan)
+
+    def x_centres(self):
+        x0, x1 = self.x_range
+        return x0 + (np.arange(self.width) + 0.5) * (x1 - x0) / self.width
+
+    def y_centres(self):
+        y0, y1 = self.y_range
+        return y0 + (np.arange(self.height) + 0.5) * (y1 - y0) / self.height
+
+
+def rasterize(x, y, x_range=None, y_range=None, width=600, height=400, values=None):
+    """One-shot Raster over the points; ranges default to the data extent."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    x_range = x_range or (np.nanmin(x), np.nanmax(x))
+    y_range = y_range or (np.nanmin(y), np.nanmax(y))
+    return Raster(x_range, y_range, width, height).update(x, y, values)
+
+
+def raster_png(z, cmap='viridis', vmin=None, vmax=None):
+    """PNG bytes of a 2-D array (row 0 at the bottom); NaN pixels are transparent."""
+    import matplotlib.image as mpimg
+
+    buf = io.BytesIO()
+    mpimg.imsave(buf, np.ma.masked_invalid(z), cmap=cmap, vmin=vmin, vmax=vmax,
+                 origin='lower', format='png')
+    return buf.getvalue()
+
+
+def raster_figure(raster, agg='count', log=True, **layout):
+    """plotly figure showing a Raster as an embedded PNG.
+
+    Only the compressed pixel image (a few KB, independent of the number of
+    listings) is embedded; an empty trace carries the colour bar.
+    """
+    import plotly.graph_objects as go
+
+    z = raster.count.astype(float) if agg == 'count' else raster.mean()
+    if agg == 'count':
+        z[z == 0] = np.nan
+        if log:
+            z = np.log10(z)
+    title = 'log10(listings)' if agg == 'count' and log else agg
+    vmin, vmax = (np.nanmin(z), np.nanmax(z)) if np.isfinite(z).any() else (0, 1)
+    png = base64.b64encode(raster_png(z, vmin=vmin, vmax=vmax)).decode('ascii')
+
+    (x0, x1), (y0, y1) = raster.x_range, raster.y_range
+    fig = go.Figure(go.Scatter(
+        x=[None], y=[None], mode='markers', showlegend=False,
+        marker=dict(colorscale='Viridis', cmin=vmin, cmax=vmax, color=[vmin],
+                    showscale=True, colorbar=dict(title=title))))
+    fig.add_layout_image(source='data:image/png;base64,' + png, xref='x', yref='y',
+                         x=x0, y=y1, sizex=x1 - x0, sizey=y1 - y0,
+                         sizing='stretch', layer='below')
+    fig.update_xaxes(range=[x0, x1], showgrid=False)
+    fig.update_yaxes(range=[y0, y1], showgrid=False)
+    fig.update_layout(**layout)
+    return fig
+
+
+def stratified_sample(df, by, n_per_group=500, seed=0):
+    """Random sample of at most `n_per_group` rows from every `by` group.
+
+    Groups smaller than the cap are kept whole, so rare combinations (e.g.
+    shared rooms on Staten Island) stay visible.
+    """
+    rng = np.random.default_rng(seed)
+    codes = df.groupby(by, observed=True).ngroup().to_numpy()
+    order = np.lexsort((rng.random(len(df)), codes))
+    sorted_codes = codes[order]
+    starts = np.searchsorted(sorted_codes, sorted_codes, side='left')
+    rank = np.arange(len(df)) - starts
+    keep = np.sort(order[(rank < n_per_group) & (sorted_codes >= 0)])
+    return df.iloc[keep]
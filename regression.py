@@ -0,0 +1,237 @@
+"""Fixed-effects OLS for price ~ neighbourhood + room_type + number_of_reviews.
+
+The 221 neighbourhood levels are absorbed rather than expanded into dummies:
+the model is fitted from chunked sufficient statistics (per-group counts and
+sums, Z'Z, Z'y, y'y for the remaining regressors Z), and the within
+estimator follows from the Frisch-Waugh-Lovell partialling
+
+    Z~'Z~ = Z'Z - sum_g (sum_g z)(sum_g z)' / n_g
+
+so memory is O(groups x regressors) no matter how many rows are streamed.
+neighbourhood_group needs no separate term: every neighbourhood lies in one
+group, so it is collinear with the neighbourhood effects.
+
+A second pass over the same chunks computes residuals for heteroskedasticity
+robust (HC1) and cluster-robust standard errors. Classical and HC1 errors
+match a dense dummy-variable OLS; clustered errors use the Stata convention
+for effects nested in clusters, so they come out slightly smaller than
+statsmodels', which counts every dummy in the small-sample factor.
+
+    model = FixedEffectsOLS('price', numeric=['number_of_reviews'],
+                            categorical=['room_type'], absorb='neighbourhood')
+    result = model.fit(df)             # or model.fit(lambda: iter_listings(path, cols))
+    result.summary('cluster')
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+
+class _Levels:
+    """Incrementally grown mapping of category values to integer codes."""
+
+    def __init__(self):
+        self.index = pd.Index([], dtype=object)
+
+    def __len__(self):
+        return len(self.index)
+
+    def codes(self, values):
+        values = pd.Series(values).astype(object)
+        codes = self.index.get_indexer(values)
+        new = codes < 0
+        if new.any():
+            fresh = pd.Index(pd.unique(values[new].dropna()), dtype=object)
+            self.index = self.index.append(fresh)
+            codes = self.index.get_indexer(values)
+        return codes
+
+
+def _grow(arr, shape):
+    """Zero-pad `arr` up to `shape` (new levels had zero contributions so far)."""
+    if arr.shape == shape:
+        return arr
+    out = np.zeros(shape)
+    out[tuple(slice(0, s) for s in arr.shape)] = arr
+    return out
+
+
+class FEResult:
+
+    def __init__(self, params, cov, nobs, n_groups, df_resid, r2_within, fixed_effects):
+        self.params = params
+        self.cov = cov
+        self.nobs = nobs
+        self.n_groups = n_groups
+        self.df_resid = df_resid
+        self.r2_within = r2_within
+        self.fixed_effects = fixed_effects
+
+    def bse(self, kind='classical'):
+        return pd.Series(np.sqrt(np.diag(self.cov[kind])), index=self.params.index, name=kind)
+
+    def summary(self, kind='classical'):
+        """Coefficients with `kind` ('classical', 'HC1' or 'cluster') standard errors."""
+        se = self.bse(kind)
+        t = self.params / se
+        p = 2 * (1 - t.abs().map(NormalDist().cdf))
+        return pd.DataFrame({'coef': self.params, 'std err': se, 't': t, 'P>|t|': p})
+
+
+class FixedEffectsOLS:
+
+    def __init__(self, y, numeric=(), categorical=(), absorb='neighbourhood',
+                 cluster=None, base=None):
+        """
+        y           -- dependent variable
+        numeric     -- regressors used as is
+        categorical -- regressors expanded into dummies (one level per
+                       variable is dropped: `base[var]` or the first in sort order)
+        absorb      -- fixed effect absorbed through group means
+        cluster     -- column for clustered standard errors (default: `absorb`)
+        """
+        self.y = y
+        self.numeric = list(numeric)
+        self.categorical = list(categorical)
+        self.absorb = absorb
+        self.cluster = cluster or absorb
+        self.base = base or {}
+        self._reset()
+
+    def _reset(self):
+        self.groups = _Levels()
+        self.levels = {c: _Levels() for c in self.categorical}
+        self.clusters = _Levels()
+        self.n = 0
+        self.g_n = np.zeros(0)
+        self.g_z = np.zeros((0, 0))
+        self.g_y = np.zeros(0)
+        self.zz = np.zeros((0, 0))
+        self.zy = np.zeros(0)
+        self.yy = 0.0
+
+    def _design(self, chunk):
+        """Dense regressor block Z for a chunk: numeric columns, then all dummies."""
+        cols = [chunk[c].to_numpy(dtype=float) for c in self.numeric]
+        for c in self.categorical:
+            codes = self.levels[c].codes(chunk[c])
+            dummies = np.zeros((len(chunk), len(self.levels[c])))
+            ok = codes >= 0
+            dummies[np.flatnonzero(ok), codes[ok]] = 1.0
+            cols.extend(dummies.T)
+        return np.column_stack(cols) if cols else np.zeros((len(chunk), 0))
+
+    def _columns(self):
+        names = list(self.numeric)
+        for c in self.categorical:
+            names.extend(f'{c}[{v}]' for v in self.levels[c].index)
+        return names
+
+    def _usable(self, chunk):
+        return chunk.dropna(subset=[self.y, self.absorb, *self.numeric, *self.categorical])
+
+    def partial_fit(self, chunk):
+        """Add a chunk's sufficient statistics (pass 1)."""
+        chunk = self._usable(chunk)
+        z = self._design(chunk)
+        y = chunk[self.y].to_numpy(dtype=float)
+        g = self.groups.codes(chunk[self.absorb])
+        k, n_groups = z.shape[1], len(self.groups)
+
+        self.g_n = _grow(self.g_n, (n_groups,)) + np.bincount(g, minlength=n_groups)
+        self.g_y = _grow(self.g_y, (n_groups,)) + np.bincount(g, weights=y, minlength=n_groups)
+        g_z = np.column_stack([np.bincount(g, weights=z[:, j], minlength=n_groups) for j in range(k)]) \
+            if k else np.zeros((n_groups, 0))
+        self.g_z = _grow(self.g_z, (n_groups, k)) + g_z
+        self.zz = _grow(self.zz, (k, k)) + z.T @ z
+        self.zy = _grow(self.zy, (k,)) + z.T @ y
+        self.yy += y @ y
+        self.n += len(y)
+        return self
+
+    def _keep(self):
+        """Indices of the regressors that are estimated (base dummy levels dropped)."""
+        keep = list(range(len(self.numeric)))
+        pos = len(self.numeric)
+        for c in self.categorical:
+            levels = list(self.levels[c].index)
+            base = self.base.get(c, sorted(levels, key=str)[0] if levels else None)
+            keep.extend(pos + i for i, v in enumerate(levels) if v != base)
+            pos += len(levels)
+        return np.array(keep, dtype=int)
+
+    def solve(self):
+        """Within estimator from the accumulated statistics."""
+        keep = self._keep()
+        inv_n = 1.0 / self.g_n
+        g_z = self.g_z[:, keep]
+        zz = self.zz[np.ix_(keep, keep)] - (g_z * inv_n[:, None]).T @ g_z
+        zy = self.zy[keep] - (g_z * inv_n[:, None]).T @ self.g_y
+        yy = self.yy - (self.g_y ** 2 * inv_n).sum()
+        self._keep_idx = keep
+        self._bread = np.linalg.inv(zz)
+        self.beta = self._bread @ zy
+        self.alpha = (self.g_y - g_z @ self.beta) * inv_n
+        self._group_mean_z = g_z * inv_n[:, None]
+        self.rss = yy - self.beta @ zy
+        self.tss_within = yy
+        self._meat_hc = np.zeros((keep.size, keep.size))
+        self._cluster_scores = np.zeros((0, keep.size))
+        return self
+
+    def residual_pass(self, chunk):
+        """Accumulate robust / clustered variance terms from residuals (pass 2)."""
+        chunk = self._usable(chunk)
+        z = self._design(chunk)[:, self._keep_idx]
+        y = chunk[self.y].to_numpy(dtype=float)
+        g = self.groups.codes(chunk[self.absorb])
+        resid = y - self.alpha[g] - z @ self.beta
+        scores = (z - self._group_mean_z[g]) * resid[:, None]
+        self._meat_hc += scores.T @ scores
+
+        c = self.clusters.codes(chunk[self.cluster])
+        n_c = len(self.clusters)
+        per_cluster = np.column_stack([np.bincount(c, weights=scores[:, j], minlength=n_c)
+                                       for j in range(scores.shape[1])])
+        self._cluster_scores = _grow(self._cluster_scores, per_cluster.shape) + per_cluster
+        return self
+
+    def result(self):
+        names = [self._columns()[i] for i in self._keep_idx]
+        k, n, n_groups = len(names), self.n, len(self.groups)
+        df_resid = n - k - n_groups
+        bread = self._bread
+        cov = {'classical': bread * self.rss / df_resid}
+        cov['HC1'] = bread @ self._meat_hc @ bread * n / df_resid
+        n_c = len(self.clusters)
+        if n_c > 1:
+            meat = self._cluster_scores.T @ self._cluster_scores
+            # Stata-style small-sample factor; the absorbed effects are nested in clusters
+            cov['cluster'] = bread @ meat @ bread * (n_c / (n_c - 1)) * ((n - 1) / (n - k))
+        return FEResult(
+            params=pd.Series(self.beta, index=names, name='coef'),
+            cov=cov, nobs=n, n_groups=n_groups, df_resid=df_resid,
+            r2_within=1 - self.rss / self.tss_within,
+            fixed_effects=pd.Series(self.alpha, index=self.groups.index, name=self.absorb),
+        )
+
+    def fit(self, data):
+        """Both passes over a DataFrame, or over `data()` when it is a callable
+        returning a fresh iterable of chunks (e.g. lambda: iter_listings(path, cols))."""
+        chunks = (lambda: [data]) if isinstance(data, pd.DataFrame) else data
+        self._reset()
+        for chunk in chunks():
+            self.partial_fit(chunk)
+        self.solve()
+        for chunk in chunks():
+            self.residual_pass(chunk)
+        return self.result()
+
+
+def fit_price_model(data, cluster='neighbourhood'):
+    """The Project 1 model: price on room type and reviews with neighbourhood effects."""
+    model = FixedEffectsOLS('price', numeric=['number_of_reviews'], categorical=['room_type'],
+                           absorb='neighbourhood', cluster=cluster)
+    return model.fit(data)
@@ -0,0 +1,408 @@
+"""Batch entry point for the Project 1 report.
+
+Computes the report tables and the figures of `Project 1 .py` from the cached
+listings, cube and sketches. Each figure is split into an `inputs` step that
+reduces the data to small aggregates (counts, bins, box statistics, a raster)
+and a `draw` step that only sees those aggregates. Plotting libraries are
+imported inside the draw steps, so a run that draws nothing never loads
+matplotlib, seaborn or plotly.
+
+In headless mode the Agg backend is used and figures are written to files
+(PNG for matplotlib, HTML for plotly) instead of plt.show() / fig.show().
+batch_report.py builds the same figures into an HTML page, redrawing only
+the figures whose inputs changed.
+
+    python report.py AB_NYC_2019.csv --headless --out-dir report
+    python report.py AB_NYC_2019.csv --figures price_hist,mean_price
+    python report.py AB_NYC_2019.csv --tables-only
+"""
+
+import argparse
+import os
+import sys
+from collections import namedtuple
+from functools import cached_property
+
+import numpy as np
+
+from agg_cube import cached_cube
+from binning import Histogram, box_stats, data_bin_edges, kde_grid, scott_bandwidth
+from bootstrap_ci import cached_mean_ci
+from heavy_hitters import cached_top_k
+from listings_loader import ANALYSIS_COLUMNS
+from outliers import fences_from_sketches, find_outliers
+from quantile_sketch import cached_sketches
+from raster import rasterize, stratified_sample
+from spatial_index import SPATIAL_COLUMNS, cached_spatial_index
+from summary_stats import summarize
+from vocabulary import Codebook, Vocabulary, drop_unused_labels, load_encoded
+
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room']
+SUMMARY_VARIABLES = ['neighbourhood_group', 'neighbourhood', 'room_type', 'number_of_reviews', 'price']
+
+_HEADLESS = False
+
+
+class ReportData:
+    """Lazily loaded inputs shared by the tables and figures of one report."""
+
+    def __init__(self, path='AB_NYC_2019.csv', **known):
+        """`known` presets any of the lazy attributes (df, cube, sketches, ...)."""
+        self.path = path
+        self.__dict__.update(known)
+
+    @cached_property
+    def vocabulary(self):
+        return Vocabulary.load(Vocabulary.default_path(self.path))
+
+    @cached_property
+    def df(self):
+        return load_encoded(self.path, columns=ANALYSIS_COLUMNS, vocabulary=self.vocabulary)
+
+    @cached_property
+    def cube(self):
+        return cached_cube(self.path, self.df)
+
+    @cached_property
+    def top_k(self):
+        return cached_top_k(self.path, self.df)
+
+    @cached_property
+    def sketches(self):
+        return cached_sketches(self.path, ['price', 'number_of_reviews'], self.df)
+
+    @cached_property
+    def spatial(self):
+        df = self.df if set(SPATIAL_COLUMNS) <= set(self.df.columns) else None
+        return cached_spatial_index(self.path, df)
+
+    @cached_property
+    def upper_limit(self):
+        return self.sketches['price'].quantile(0.95)
+
+    @cached_property
+    def filtered(self):
+        return self.df[self.df['price'] <= self.upper_limit]
+
+    @cached_property
+    def summary(self):
+        return summarize(self.df, SUMMARY_VARIABLES)
+
+    def tables(self):
+        outliers = find_outliers(self.df, ['price', 'number_of_reviews'],
+                                 fences=fences_from_sketches(self.sketches))
+        return {
+            'summary': self.summary,
+            'outlier_counts': outliers.counts().to_frame(),
+            'frac_matrix_norm': self.cube.fraction_matrix('neighbourhood_group', 'room_type'),
+            'mean_price': cached_mean_ci(self.path, self.df, ['neighbourhood_group', 'room_type'], seed=0),
+        }
+
+
+# Plotting backends, imported on first use
+
+def _pyplot():
+    import matplotlib
+    if _HEADLESS:
+        matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    sns.set(style='whitegrid')
+    return plt, sns
+
+
+# Figure inputs: small aggregates only
+
+def _counts_inputs(dim):
+    return lambda data: {'counts': data.cube.counts(dim)}
+
+
+def _top_neighbourhood_inputs(data, n=10):
+    return {'counts': data.top_k.top(n, other='Other').sort_values(ascending=False)}
+
+
+def _hist_inputs(column, hi, bins):
+    def inputs(data):
+        vmin, vmax = data.summary.loc[column, ['min', 'max']]
+        hist = Histogram(data_bin_edges(vmin, vmax, bins, hi)).update(data.df[column])
+        return {'edges': hist.edges, 'counts': hist.counts[0], 'xlim': (0, hi)}
+    return inputs
+
+
+def _box_inputs(by, filtered):
+    def inputs(data):
+        frame = data.filtered if filtered else data.df
+        return {'stats': box_stats(frame['price'], frame[by].astype(object))}
+    return inputs
+
+
+def _raster_inputs(data):
+    raster = rasterize(data.df['number_of_reviews'], data.df['price'],
+                       x_range=(0, data.summary.loc['number_of_reviews', 'max']),
+                       y_range=(0, data.summary.loc['price', 'max']))
+    return {'raster': raster}
+
+
+def _fraction_inputs(data):
+    return {'fractions': data.cube.fraction_matrix('neighbourhood_group', 'room_type')}
+
+
+def _violin_inputs(data):
+    # The frame's own categories: a preset df may be encoded with another vocabulary
+    room = data.df['room_type']
+    codes = Codebook(room.cat.categories).recode(room.cat.codes, ROOM_TYPES)
+    bins = Histogram(np.arange(-0.5, 400.5), n_groups=len(ROOM_TYPES)).update(
+        data.df['number_of_reviews'], codes)
+    stats = data.cube.rollup('room_type').loc[ROOM_TYPES]
+    sketches = data.cube.sketch('room_type', 'number_of_reviews')
+    densities = []
+    for i, room in enumerate(ROOM_TYPES):
+        bw = scott_bandwidth(stats.loc[room, 'count'], stats.loc[room, 'number_of_reviews_std'])
+        grid, density = kde_grid(bins, bw, group=i)
+        densities.append(density)
+    return {'grid': grid, 'densities': densities,
+            'extrema': [(sketches[r].min, sketches[r].max) for r in ROOM_TYPES]}
+
+
+def _strip_inputs(data):
+    sample = stratified_sample(data.df, ['neighbourhood_group', 'room_type'], n_per_group=300)
+    return {'sample': drop_unused_labels(sample[['neighbourhood_group', 'room_type', 'price']])}
+
+
+def _price_map_inputs(data):
+    z, lats, lons = data.spatial.heatmap('median_price', min_count=3)
+    return {'z': z, 'lats': lats, 'lons': lons, 'cell_size': data.spatial.cell_size}
+
+
+def _mean_price_inputs(data):
+    return {'ci': cached_mean_ci(data.path, data.df, ['neighbourhood_group', 'room_type'], 'price', seed=0)}
+
+
+# Drawing: only sees the inputs above
+
+def _draw_counts(title, xlabel, horizontal=False):
+    def draw(inputs):
+        plt, sns = _pyplot()
+        counts = inputs['counts']
+        fig, ax = plt.subplots(figsize=(12, 6) if horizontal else (10, 6))
+        if horizontal:
+            sns.barplot(x=counts.values, y=counts.index.astype(str), color='skyblue', ax=ax)
+            ax.set(title=title, xlabel='Frequency', ylabel=xlabel)
+        else:
+            labels = counts.index.astype(str)
+            sns.barplot(x=labels, y=counts.values, hue=labels, legend=False,
+                        palette=sns.color_palette('muted', len(counts)), ax=ax)
+            ax.set(title=title, xlabel=xlabel, ylabel='Frequency')
+        return fig
+    return draw
+
+
+def _draw_hist(title, xlabel):
+    def draw(inputs):
+        plt, _ = _pyplot()
+        fig, ax = plt.subplots(figsize=(10, 6))
+        edges = inputs['edges']
+        ax.bar(edges[:-1], inputs['counts'], width=np.diff(edges), align='edge',
+               color='skyblue', edgecolor='white', linewidth=0.5)
+        ax.set(title=title, xlabel=xlabel, ylabel='Frequency', xlim=inputs['xlim'])
+        return fig
+    return draw
+
+
+def _draw_box(title, xlabel):
+    def draw(inputs):
+        plt, sns = _pyplot()
+        from binning import plot_boxes
+
+        fig, ax = plt.subplots(figsize=(12, 6))
+        plot_boxes(ax, inputs['stats'], colors=sns.color_palette())
+        ax.set(title=title, xlabel=xlabel, ylabel='Price')
+        return fig
+    return draw
+
+
+def _draw_raster(inputs):
+    from raster import raster_figure
+
+    return raster_figure(inputs['raster'], title='Airbnb Price vs Number of Reviews',
+                         xaxis_title='Number of Reviews', yaxis_title='Price Per Night',
+                         width=1000, height=600)
+
+
+def _draw_fractions(inputs):
+    plt, _ = _pyplot()
+    fig, ax = plt.subplots(figsize=(10, 6))
+    inputs['fractions'].plot(kind='bar', stacked=True, ax=ax)
+    ax.set(ylabel='Room Type Fraction', xlabel='Neighbourhood Group',
+           title='Fraction of Room Types Across Neighborhood Groups')
+    ax.legend(title='Room Type', loc='upper right')
+    return fig
+
+
+def _draw_violin(inputs):
+    plt, _ = _pyplot()
+    from binning import plot_violins
+
+    fig, ax = plt.subplots()
+    plot_violins(ax, inputs['grid'], inputs['densities'], extrema=inputs['extrema'])
+    ax.set_xticks([1, 2, 3], ROOM_TYPES)
+    ax.set(ylabel='Number of Reviews', xlabel='Room Type', ylim=(0, 300),
+           title='Distribution of the Number of Reviews for Each Room Type')
+    return fig
+
+
+def _draw_strip(inputs):
+    plt, sns = _pyplot()
+    fig, ax = plt.subplots(figsize=(9, 5))
+    sns.stripplot(x='neighbourhood_group', y='price', hue='room_type', data=inputs['sample'],
+                  palette='muted', ax=ax, dodge=True)
+    ax.set(title='Prices Distribution by Neighbourhood Group and Room Type (Unadjusted)',
+           xlabel='Neighbourhood Group', ylabel='Price (in dollars)')
+    ax.legend(title='Room Type')
+    return fig
+
+
+def _draw_price_map(inputs):
+    plt, _ = _pyplot()
+    lats, lons = inputs['lats'], inputs['lons']
+    fig, ax = plt.subplots(figsize=(8, 8))
+    image = ax.pcolormesh(lons, lats, inputs['z'], cmap='viridis', shading='nearest',
+                          vmax=np.nanquantile(inputs['z'], 0.98))
+    fig.colorbar(image, ax=ax, label='Median Price (in dollars)')
+    ax.set_aspect(1 / np.cos(np.radians(lats.mean())))
+    ax.tick_params(axis='x', labelrotation=45)
+    ax.set(title=f'Median Price per {inputs["cell_size"]:.0f} m Cell (3+ listings)',
+           xlabel='Longitude', ylabel='Latitude')
+    return fig
+
+
+def _draw_mean_price(inputs):
+    plt, sns = _pyplot()
+    from bootstrap_ci import plot_mean_ci
+
+    fig, ax = plt.subplots(figsize=(9, 5))
+    plot_mean_ci(ax, inputs['ci'], colors=sns.color_palette('muted'))
+    ax.legend(title='room_type')
+    ax.set(title='Average Price by Neighbourhood Group and Room Type',
+           xlabel='Neighbourhood Group', ylabel='Average Price (in dollars)')
+    return fig
+
+
+# columns: the listing columns a figure is drawn from, so callers that know
+# which columns changed (snapshots.py) can redraw only the affected figures
+Figure = namedtuple('Figure', 'name inputs draw kind columns')
+
+GROUP, HOOD, ROOM = 'neighbourhood_group', 'neighbourhood', 'room_type'
+REVIEWS, PRICE = 'number_of_reviews', 'price'
+
+FIGURES = [
+    Figure('group_counts', _counts_inputs(GROUP),
+           _draw_counts('Distribution of Listings Across Neighborhood Groups', 'Neighborhood Group'),
+           'mpl', {GROUP}),
+    Figure('top_neighbourhoods', _top_neighbourhood_inputs,
+           _draw_counts('Top 10 Neighborhoods Distribution', 'Neighborhood', horizontal=True),
+           'mpl', {HOOD}),
+    Figure('room_counts', _counts_inputs(ROOM),
+           _draw_counts('Distribution of Listings Across Room Types', 'Room Type'), 'mpl', {ROOM}),
+    Figure('reviews_hist', _hist_inputs(REVIEWS, 300, 50),
+           _draw_hist('Distribution of Number of Reviews', 'Number of Reviews'), 'mpl', {REVIEWS}),
+    Figure('price_hist', _hist_inputs(PRICE, 1500, 100),
+           _draw_hist('Distribution of Airbnb Listing Price', 'Price (in dollars)'), 'mpl', {PRICE}),
+    Figure('price_box_group', _box_inputs(GROUP, filtered=False),
+           _draw_box('Price Distribution Across Neighborhood Groups (Unfiltered)', 'Neighbourhood Group'),
+           'mpl', {GROUP, PRICE}),
+    Figure('price_box_group_filtered', _box_inputs(GROUP, filtered=True),
+           _draw_box('Price Distribution Across Neighborhood Groups (Filtered Outliers)', 'Neighbourhood Group'),
+           'mpl', {GROUP, PRICE}),
+    Figure('price_box_room_filtered', _box_inputs(ROOM, filtered=True),
+           _draw_box('Price Distribution By Room Type (Filtered Outliers)', 'Room Type'),
+           'mpl', {ROOM, PRICE}),
+    Figure('price_vs_reviews', _raster_inputs, _draw_raster, 'plotly', {REVIEWS, PRICE}),
+    Figure('room_fractions', _fraction_inputs, _draw_fractions, 'mpl', {GROUP, ROOM}),
+    Figure('reviews_violin', _violin_inputs, _draw_violin, 'mpl', {ROOM, REVIEWS}),
+    Figure('price_strip', _strip_inputs, _draw_strip, 'mpl', {GROUP, ROOM, PRICE}),
+    Figure('mean_price', _mean_price_inputs, _draw_mean_price, 'mpl', {GROUP, ROOM, PRICE}),
+    Figure('price_map', _price_map_inputs, _draw_price_map, 'mpl', {'latitude', 'longitude', PRICE}),
+]
+
+
+def set_headless(headless=True):
+    """Draw on the Agg backend and write files instead of showing figures."""
+    global _HEADLESS
+    _HEADLESS = headless
+
+
+def emit(fig, spec, out_dir=None):
+    """Show a figure, or write it to `out_dir` in headless mode; returns the path."""
+    if spec.kind == 'plotly':
+        if not _HEADLESS:
+            fig.show()
+            return None
+        path = os.path.join(out_dir, spec.name + '.html')
+        fig.write_html(path, include_plotlyjs='cdn')
+        return path
+    plt, _ = _pyplot()
+    if not _HEADLESS:
+        plt.show()
+        return None
+    path = os.path.join(out_dir, spec.name + '.png')
+    fig.savefig(path, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return path
+
+
+def render(data, specs, out_dir=None):
+    """Draw each figure in `specs` from `data`; yields the written paths."""
+    if _HEADLESS:
+        os.makedirs(out_dir, exist_ok=True)
+    for spec in specs:
+        path = emit(spec.draw(spec.inputs(data)), spec, out_dir)
+        if path:
+            yield path
+
+
+def select_figures(names=None):
+    if not names:
+        return list(FIGURES)
+    known = {f.name: f for f in FIGURES}
+    missing = [n for n in names if n not in known]
+    if missing:
+        raise KeyError(f'unknown figures: {", ".join(missing)}')
+    return [known[n] for n in names]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Project 1 report: tables and figures.')
+    parser.add_argument('path', nargs='?', default='AB_NYC_2019.csv', help='listings CSV')
+    parser.add_argument('--headless', action='store_true',
+                        help='Agg backend; write figures to --out-dir instead of showing them')
+    parser.add_argument('--out-dir', default='report', help='output directory in headless mode')
+    parser.add_argument('--figures', help='comma-separated figure names (default: all)')
+    parser.add_argument('--tables-only', action='store_true', help='compute the tables, draw nothing')
+    parser.add_argument('--list', action='store_true', help='list figure names and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print('\n'.join(f.name for f in FIGURES))
+        return
+    set_headless(args.headless)
+    data = ReportData(args.path)
+
+    tables = data.tables()
+    if args.headless:
+        os.makedirs(args.out_dir, exist_ok=True)
+        for name, table in tables.items():
+            table.to_csv(os.path.join(args.out_dir, name + '.csv'))
+    else:
+        for name, table in tables.items():
+            print(f'== {name}\n{table}\n')
+    if args.tables_only:
+        return
+
+    for path in render(data, select_figures(args.figures.split(',') if args.figures else None),
+                       args.out_dir):
+        print(path)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
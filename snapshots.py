@@ -0,0 +1,270 @@
+"""Incremental ingestion of monthly listing snapshots, keyed on listing id.
+
+A ReportState holds the mergeable aggregates behind the report (summary
+engine, aggregation cube, outlier index) together with the snapshot they
+describe. ingest() compares a new snapshot with the stored one, which finds
+the inserted, updated and removed listings from per-row digests, and then
+applies only those rows:
+
+- removed and the old version of updated rows are taken out of every
+  aggregate (QuantileSketch.remove, Moments.remove, AggCube.remove, ...)
+- inserted and the new version of updated rows are added
+
+so the aggregate work is proportional to the size of the change. Reading and
+hashing the new snapshot is still one pass over it. The report tables are
+recomputed from the aggregates (cheap: they are read off a few hundred cells)
+and compared with the previous ones, and only the figures drawn from a column
+that changed are re-rendered.
+
+Removal needs exact sketches, so by default (compression=None) the price and
+review sketches keep exact value counts; both are integer columns with a few
+thousand distinct values at most. With a numeric compression a sketch that
+outgrows it is approximate, and ingest() falls back to rebuilding the state
+from the new snapshot.
+
+The state is kept per series of snapshots (by default the file name, so a
+listings file replaced by each month's export), under .cache next to the CSV.
+Give differently named monthly files the same --series:
+
+    python snapshots.py listings-2019-07.csv --series nyc    # first run: full build
+    python snapshots.py listings-2019-08.csv --series nyc    # deltas only
+"""
+
+import argparse
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from agg_cube import AggCube
+from duplicates import row_digests
+from listings_loader import ALL_COLUMNS, ANALYSIS_COLUMNS, CACHE_DIR, load_versioned, save_versioned
+from outliers import OutlierIndex, fences_from_sketches
+from pipeline import OUTLIER_COLUMNS, PRICE_LIMIT_Q, SUMMARY_VARIABLES, cube_tables, tables_equal
+from summary_stats import SummaryEngine
+from vocabulary import load_encoded
+
+KEY = 'id'
+SNAPSHOT_COLUMNS = [c for c in ALL_COLUMNS
+                    if c == KEY or c in ANALYSIS_COLUMNS or c in ('latitude', 'longitude')]
+
+# Bump when the pickled layout changes so stale states are rebuilt
+STATE_VERSION = 2
+
+
+class SnapshotDiff:
+    """Rows that differ between two snapshots of the same listings."""
+
+    def __init__(self, inserted, removed, updated_old, updated_new, columns):
+        self.inserted = inserted
+        self.removed = removed
+        self.updated_old = updated_old
+        self.updated_new = updated_new
+        self.columns = columns    # set of columns whose values changed
+
+    def __len__(self):
+        return len(self.inserted) + len(self.removed) + len(self.updated_new)
+
+    def counts(self):
+        return {'inserted': len(self.inserted), 'updated': len(self.updated_new),
+                'removed': len(self.removed)}
+
+
+def _changed_columns(old, new, columns):
+    changed = set()
+    for c in columns:
+        a = old[c].astype(object).to_numpy()
+        b = new[c].astype(object).to_numpy()
+        if (~((a == b) | (pd.isna(a) & pd.isna(b)))).any():
+            changed.add(c)
+    return changed
+
+
+def diff_snapshots(old, new, key=KEY):
+    """Inserted, updated and removed rows of `new` relative to `old`.
+
+    Rows are matched on `key`; a matched row is updated when any other shared
+    column differs, which is decided on one 64-bit digest per row.
+    """
+    for frame in (old, new):
+        if frame[key].duplicated().any():
+            raise ValueError(f'snapshot has duplicate {key} values')
+    columns = [c for c in new.columns if c != key and c in old.columns]
+    old_ids, new_ids = pd.Index(old[key].to_numpy()), pd.Index(new[key].to_numpy())
+
+    pos = old_ids.get_indexer(new_ids)      # row of each new id in old, -1 if new
+    matched = pos >= 0
+    changed = np.zeros(len(new), dtype=bool)
+    changed[matched] = row_digests(new[columns])[matched] != row_digests(old[columns])[pos[matched]]
+
+    updated_old = old.iloc[pos[changed]]
+    updated_new = new.iloc[np.flatnonzero(changed)]
+    inserted = new.iloc[np.flatnonzero(~matched)]
+    removed = old.iloc[np.flatnonzero(~old_ids.isin(new_ids))]
+    touched = set(columns) if len(inserted) or len(removed) else set()
+    touched |= _changed_columns(updated_old, updated_new, columns)
+    return SnapshotDiff(inserted, removed, updated_old, updated_new, touched)
+
+
+class ReportState:
+    """The report aggregates for one snapshot, updatable by SnapshotDiff."""
+
+    def __init__(self, compression=None):
+        self.summary = SummaryEngine(SUMMARY_VARIABLES, compression)
+        self.cube = AggCube(compression=compression)
+        self.outliers = OutlierIndex(OUTLIER_COLUMNS, key=KEY)
+        self.frame = None
+        self.source = None
+
+    @classmethod
+    def build(cls, df, source=None, compression=None):
+        state = cls(compression)
+        state.add(df)
+        state.frame, state.source = df, source
+        return state
+
+    def add(self, rows):
+        if len(rows):
+            self.summary.update(rows)
+            self.cube.update(rows)
+            self.outliers.update(rows)
+        return self
+
+    def remove(self, rows):
+        if len(rows):
+            self.summary.remove(rows)
+            self.cube.remove(rows)
+            self.outliers.remove(rows)
+        return self
+
+    def apply(self, diff, new_frame, source=None):
+        """Move the aggregates to `new_frame`, given diff(self.frame, new_frame).
+
+        Raises ValueError if a sketch is approximate and cannot remove values;
+        the state is then inconsistent and must be rebuilt.
+        """
+        self.remove(pd.concat([diff.removed, diff.updated_old]))
+        self.add(pd.concat([diff.updated_new, diff.inserted]))
+        self.frame, self.source = new_frame, source
+        return self
+
+    def sketches(self):
+        return {c: self.summary.accumulators[c].sketch for c in OUTLIER_COLUMNS}
+
+    def tables(self):
+        sketches = self.sketches()
+        fences = fences_from_sketches(sketches)
+        tables = {
+            'summary': self.summary.table(),
+            'outlier_fences': fences,
+            'outlier_counts': self.outliers.counts(fences),
+            'outliers': self.outliers.outliers(fences),
+            'upper_limit': sketches['price'].quantile(PRICE_LIMIT_Q),
+        }
+        tables.update(cube_tables(self.cube))
+        return tables
+
+
+def default_state_path(path, series=None):
+    """State file for the snapshot series `series` (default: the file name of `path`)."""
+    series = series or os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR, f'snapshot_state-{series}.pkl')
+
+
+def _load_state(path):
+    # Not load_or_build: a missing state is built from the new snapshot only
+    # after the load is timed, and it is saved once the tables are computed
+    if not os.path.exists(path):
+        return None
+    try:
+        return load_versioned(path, STATE_VERSION)
+    except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def ingest(path, state_path=None, out_dir='report', figures=True, series=None):
+    """Bring the stored report state of `series` up to the snapshot at `path`.
+
+    Writes the tables that changed to `out_dir` as CSV and, with `figures`,
+    re-renders the figures drawn from a changed column. Returns a dict with
+    the diff counts, changed tables, written figure paths and timings.
+    """
+    state_path = state_path or default_state_path(path, series)
+    timings = {}
+    start = time.perf_counter()
+    new = load_encoded(path, columns=SNAPSHOT_COLUMNS)
+    timings['load'] = time.perf_counter() - start
+
+    state = _load_state(state_path)
+    diff, rebuilt = None, state is None
+    if state is not None:
+        start = time.perf_counter()
+        diff = diff_snapshots(state.frame, new)
+        timings['diff'] = time.perf_counter() - start
+        before = state.tables()
+        start = time.perf_counter()
+        try:
+            state.apply(diff, new, source=path)
+        except ValueError:
+            rebuilt = True
+        timings['apply'] = time.perf_counter() - start
+    if rebuilt:
+        start = time.perf_counter()
+        state = ReportState.build(new, source=path)
+        timings['build'] = time.perf_counter() - start
+
+    tables = state.tables()
+    if diff is None:
+        changed_tables, changed_columns = list(tables), set(SNAPSHOT_COLUMNS)
+    else:
+        changed_tables, changed_columns = tables_equal(before, tables), diff.columns
+    save_versioned(state, state_path, STATE_VERSION)
+
+    os.makedirs(out_dir, exist_ok=True)
+    for name in changed_tables:
+        table = tables[name]
+        if not isinstance(table, (pd.DataFrame, pd.Series)):
+            table = pd.Series([table], name=name)
+        table.to_csv(os.path.join(out_dir, name + '.csv'))
+
+    written = []
+    if figures:
+        import report
+
+        start = time.perf_counter()
+        report.set_headless()
+        specs = [f for f in report.FIGURES if f.columns & changed_columns]
+        data = report.ReportData(path, df=new, cube=state.cube, sketches=state.sketches(),
+                                 summary=tables['summary'])
+        written = list(report.render(data, specs, out_dir))
+        timings['render'] = time.perf_counter() - start
+
+    return {'diff': diff.counts() if diff is not None else None, 'rebuilt': rebuilt,
+            'changed_columns': sorted(changed_columns), 'changed_tables': changed_tables,
+            'figures': written, 'timings': timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply a new listings snapshot to the stored report state.')
+    parser.add_argument('path', help='new snapshot CSV')
+    parser.add_argument('--series', help='name shared by the snapshots of one listings feed (default: file name)')
+    parser.add_argument('--state', help='state file (default: .cache/snapshot_state-<series>.pkl next to the CSV)')
+    parser.add_argument('--out-dir', default='report', help='where changed tables and figures are written')
+    parser.add_argument('--no-figures', action='store_true', help='update the tables only')
+    args = parser.parse_args(argv)
+
+    result = ingest(args.path, args.state, args.out_dir, figures=not args.no_figures, series=args.series)
+    if result['diff'] is None:
+        print('no previous state: built from scratch')
+    else:
+        print(', '.join(f'{n:,} {k}' for k, n in result['diff'].items())
+              + (' (sketch approximate: rebuilt)' if result['rebuilt'] else ''))
+    print('changed tables:', ', '.join(result['changed_tables']) or 'none')
+    print('figures redrawn:', ', '.join(os.path.basename(p) for p in result['figures']) or 'none')
+    print('timings:', ', '.join(f'{k} {v:.3f}s' for k, v in result['timings'].items()))
+
+
+if __name__ == '__main__':
+    main()
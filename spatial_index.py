@@ -0,0 +1,218 @@
+"""Uniform grid index over listing coordinates for local price queries.
+
+Latitude/longitude are projected to metres on a local equirectangular plane
+(distance error well under 0.1% across New York City) and bucketed into square
+cells of `cell_size` metres. Listings are stored sorted by (cell, room type),
+so the listings of a cell, or of one room type within a cell, are one
+contiguous slice. A query only reads the cells overlapping its search circle
+instead of scanning the frame, and the index is cached next to the data cache.
+
+    grid = cached_spatial_index('AB_NYC_2019.csv')
+    grid.median_price(40.7128, -74.0060, 500)                    # within 500 m
+    grid.nearest(40.7128, -74.0060, k=10, room_type='Private room')
+    grid.comparables(2539, k=10)                                 # same room type
+    z, lats, lons = grid.heatmap('median_price')
+"""
+
+import numpy as np
+import pandas as pd
+
+from listings_loader import cache_path, load_or_build
+
+EARTH_RADIUS = 6_371_008.8
+SPATIAL_COLUMNS = ['id', 'latitude', 'longitude', 'room_type', 'price']
+
+# Bump when the pickled layout changes so stale indexes are rebuilt
+INDEX_VERSION = 2
+
+
+def _concat_ranges(starts, ends):
+    """Concatenation of arange(s, e) for every (s, e) pair, without a Python loop."""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return np.arange(total) + shifts
+
+
+class SpatialGrid:
+
+    def __init__(self, ids, lat, lon, room_codes, rooms, price, cell_size=250):
+        """
+        ids        -- listing id per row
+        room_codes -- integer code into `rooms` per row (-1 for missing)
+        cell_size  -- cell edge in metres; about the typical query radius / 2
+        """
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        room_codes = np.asarray(room_codes, dtype=np.int64)
+        keep = ~np.isnan(lat) & ~np.isnan(lon) & (room_codes >= 0)
+        lat, lon, room_codes = lat[keep], lon[keep], room_codes[keep]
+
+        self.cell_size = float(cell_size)
+        self.rooms = [str(r) for r in rooms]
+        self.lat0, self.lon0 = float(lat.min()), float(lon.min())
+        self.lat_ref = float((lat.min() + lat.max()) / 2)
+        x, y = self.project(lat, lon)
+        self.nx = int(x.max() // self.cell_size) + 1
+        self.ny = int(y.max() // self.cell_size) + 1
+
+        cell = (y // self.cell_size).astype(np.int64) * self.nx + (x // self.cell_size).astype(np.int64)
+        key = cell * len(self.rooms) + room_codes
+        order = np.argsort(key, kind='stable')
+        self.ids = np.asarray(ids)[keep][order]
+        self.x, self.y = x[order], y[order]
+        self.room = room_codes[order].astype(np.int8)
+        self.price = np.asarray(price, dtype=float)[keep][order]
+        # offsets[k]:offsets[k + 1] are the rows with key k
+        self.offsets = np.searchsorted(key[order], np.arange(self.nx * self.ny * len(self.rooms) + 1))
+        self.by_id = np.argsort(self.ids, kind='stable')
+
+    @classmethod
+    def from_frame(cls, df, cell_size=250):
+        rooms = pd.Categorical(df['room_type'])
+        return cls(df['id'].to_numpy(), df['latitude'].to_numpy(), df['longitude'].to_numpy(),
+                   rooms.codes, rooms.categories, df['price'].to_numpy(), cell_size)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def project(self, lat, lon):
+        """Metres east and north of the grid origin."""
+        scale = np.pi / 180 * EARTH_RADIUS
+        x = (np.asarray(lon, dtype=float) - self.lon0) * scale * np.cos(np.radians(self.lat_ref))
+        y = (np.asarray(lat, dtype=float) - self.lat0) * scale
+        return x, y
+
+    def unproject(self, x, y):
+        scale = np.pi / 180 * EARTH_RADIUS
+        lat = self.lat0 + np.asarray(y) / scale
+        lon = self.lon0 + np.asarray(x) / (scale * np.cos(np.radians(self.lat_ref)))
+        return lat, lon
+
+    def _room_code(self, room_type):
+        if room_type is None:
+            return None
+        try:
+            return self.rooms.index(room_type)
+        except ValueError:
+            raise KeyError(f'unknown room_type {room_type!r}') from None
+
+    def _candidates(self, x, y, radius, room=None):
+        """Row positions in the cells overlapping the square around (x, y)."""
+        cs = self.cell_size
+        c0, c1 = max(int((x - radius) // cs), 0), min(int((x + radius) // cs), self.nx - 1)
+        r0, r1 = max(int((y - radius) // cs), 0), min(int((y + radius) // cs), self.ny - 1)
+        if c0 > c1 or r0 > r1:
+            return np.empty(0, dtype=np.int64)
+        n_rooms = len(self.rooms)
+        rows = np.arange(r0, r1 + 1) * self.nx
+        if room is None:
+            # All room types of a run of cells in one grid row are contiguous
+            starts, ends = self.offsets[(rows + c0) * n_rooms], self.offsets[(rows + c1 + 1) * n_rooms]
+        else:
+            keys = ((rows[:, None] + np.arange(c0, c1 + 1)).ravel()) * n_rooms + room
+            starts, ends = self.offsets[keys], self.offsets[keys + 1]
+        return _concat_ranges(starts, ends)
+
+    def _within(self, x, y, radius, room=None):
+        pos = self._candidates(x, y, radius, room)
+        dist = np.hypot(self.x[pos] - x, self.y[pos] - y)
+        inside = dist <= radius
+        return pos[inside], dist[inside]
+
+    def query_radius(self, lat, lon, radius, room_type=None):
+        """(ids, distances in metres) of the listings within `radius` metres."""
+        x, y = self.project(lat, lon)
+        pos, dist = self._within(float(x), float(y), radius, self._room_code(room_type))
+        return self.ids[pos], dist
+
+    def median_price(self, lat, lon, radius, room_type=None):
+        """Median price of the listings within `radius` metres (NaN if none)."""
+        x, y = self.project(lat, lon)
+        pos, _ = self._within(float(x), float(y), radius, self._room_code(room_type))
+        return float(np.median(self.price[pos])) if pos.size else float('nan')
+
+    def _nearest(self, x, y, k, room=None, exclude=None):
+        # Grow the search radius until k listings lie inside it; everything
+        # within the radius is among the candidates, so the k closest are exact
+        far = np.hypot(max(abs(x), abs(self.nx * self.cell_size - x)),
+                       max(abs(y), abs(self.ny * self.cell_size - y)))
+        radius = self.cell_size
+        while True:
+            pos = self._candidates(x, y, radius, room)
+            if exclude is not None:
+                pos = pos[pos != exclude]
+            dist = np.hypot(self.x[pos] - x, self.y[pos] - y)
+            if (dist <= radius).sum() >= k or radius >= far:
+                break
+            radius *= 2
+        if pos.size > k:
+            top = np.argpartition(dist, k - 1)[:k]
+            pos, dist = pos[top], dist[top]
+        order = np.argsort(dist, kind='stable')
+        return pos[order], dist[order]
+
+    def nearest(self, lat, lon, k=10, room_type=None):
+        """(ids, distances in metres) of the k nearest listings, closest first."""
+        x, y = self.project(lat, lon)
+        pos, dist = self._nearest(float(x), float(y), k, self._room_code(room_type))
+        return self.ids[pos], dist
+
+    def position(self, listing_id):
+        i = np.searchsorted(self.ids, listing_id, sorter=self.by_id)
+        if i >= len(self.ids) or self.ids[self.by_id[i]] != listing_id:
+            raise KeyError(f'listing {listing_id} is not in the index')
+        return int(self.by_id[i])
+
+    def comparables(self, listing_id, k=10):
+        """The k nearest other listings of the same room type as `listing_id`."""
+        p = self.position(listing_id)
+        pos, dist = self._nearest(self.x[p], self.y[p], k, int(self.room[p]), exclude=p)
+        return pd.DataFrame({'id': self.ids[pos], 'distance_m': dist, 'price': self.price[pos],
+                             'room_type': [self.rooms[r] for r in self.room[pos]]})
+
+    def cell_stats(self, room_type=None):
+        """Count, mean and median price per non-empty cell, with cell centres."""
+        room = self._room_code(room_type)
+        rows = np.arange(len(self)) if room is None else np.flatnonzero(self.room == room)
+        cell = ((self.y[rows] // self.cell_size).astype(np.int64) * self.nx
+                + (self.x[rows] // self.cell_size).astype(np.int64))
+        price = self.price[rows]
+        order = np.lexsort((price, cell))
+        cell, price = cell[order], price[order]
+        cells, start, count = np.unique(cell, return_index=True, return_counts=True)
+        median = (price[start + (count - 1) // 2] + price[start + count // 2]) / 2
+        mean = np.add.reduceat(price, start) / count if cells.size else np.zeros(0)
+        row, col = np.divmod(cells, self.nx)
+        lat, lon = self.unproject((col + 0.5) * self.cell_size, (row + 0.5) * self.cell_size)
+        return pd.DataFrame({'row': row, 'col': col, 'latitude': lat, 'longitude': lon,
+                             'count': count, 'mean_price': mean, 'median_price': median},
+                            index=pd.Index(cells, name='cell'))
+
+    def heatmap(self, stat='median_price', room_type=None, min_count=1):
+        """(ny x nx array of `stat` per cell, cell-centre latitudes, longitudes).
+
+        Cells with fewer than `min_count` listings are NaN.
+        """
+        cells = self.cell_stats(room_type)
+        cells = cells[cells['count'] >= min_count]
+        z = np.full((self.ny, self.nx), np.nan)
+        z[cells['row'], cells['col']] = cells[stat]
+        lats, _ = self.unproject(0, (np.arange(self.ny) + 0.5) * self.cell_size)
+        _, lons = self.unproject((np.arange(self.nx) + 0.5) * self.cell_size, 0)
+        return z, lats, lons
+
+
+def cached_spatial_index(path, df=None, cell_size=250, cache_dir=None):
+    """The grid for listings file `path`, cached next to the data (built from
+    `df`, or by loading `path`, on a miss)."""
+    def build():
+        frame = df
+        if frame is None:
+            from listings_loader import load_listings
+            frame = load_listings(path, columns=SPATIAL_COLUMNS, cache_dir=cache_dir)
+        return SpatialGrid.from_frame(frame, cell_size)
+    target = cache_path(path, f'.grid{int(cell_size)}.pkl', cache_dir=cache_dir)
+    return load_or_build(target, INDEX_VERSION, build)
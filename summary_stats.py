@@ -0,0 +1,232 @@
+"""Single-pass summary statistics for the Project 1 summary table.
+
+SummaryEngine produces the same table as the notebook's loop of
+`df[var].describe(include='all')` calls, but reads each chunk once and keeps
+only mergeable accumulators:
+
+- categorical columns: value counts  -> count, unique, top, freq
+- numeric columns: Welford/Chan moments -> count, mean, std
+                   QuantileSketch       -> min, 25%, 50%, 75%, max
+
+Tolerance against pandas: counts, unique, top, freq, min and max are exact.
+mean and std agree to floating point rounding (relative error ~1e-12).
+Quantiles are exact while a column has at most `compression` distinct values
+(price and number_of_reviews in AB_NYC_2019 have a few hundred); beyond that
+they carry the QuantileSketch approximation error.
+
+    engine = SummaryEngine(variables)
+    for chunk in iter_listings('AB_NYC_2019.csv', columns=variables):
+        engine.update(chunk)
+    summary_df = engine.table()
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from quantile_sketch import QuantileSketch
+
+SUMMARY_COLUMNS = ['count', 'unique', 'top', 'freq',
+                   'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+PERCENTILES = [0.25, 0.5, 0.75]
+
+
+class CategoryCounts:
+    """Mergeable value counts of a categorical column."""
+
+    def __init__(self):
+        self.counts = pd.Series(dtype='int64')
+
+    @staticmethod
+    def _value_counts(values):
+        vc = pd.Series(values).value_counts(sort=False)
+        vc.index = vc.index.astype(object)
+        return vc
+
+    @staticmethod
+    def _ranked(counts):
+        """Counts sorted most frequent first, ties to the first label in sort order."""
+        return counts.sort_index(kind='stable').sort_values(ascending=False, kind='stable')
+
+    def update(self, values):
+        return self.add_counts(self._value_counts(values))
+
+    def add_counts(self, counts):
+        """Add a Series of counts indexed by label (e.g. from a group-by)."""
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        return self
+
+    def merge(self, other):
+        return self.add_counts(other.counts)
+
+    def remove(self, values):
+        return self.remove_counts(self._value_counts(values))
+
+    def remove_counts(self, counts):
+        self.counts = self.counts.sub(counts, fill_value=0).astype('int64')
+        self.counts = self.counts[self.counts > 0]
+        return self
+
+    def top(self, n=None):
+        """The `n` most frequent labels and their counts (all when n is None).
+
+        Ties go to the first label in sort order.
+        """
+        observed = self._ranked(self.counts[self.counts > 0])
+        return observed if n is None else observed.iloc[:n]
+
+    def stats(self):
+        observed = self.top()
+        if observed.empty:
+            return {'count': 0, 'unique': 0, 'top': np.nan, 'freq': np.nan}
+        return {'count': int(observed.sum()), 'unique': int(observed.size),
+                'top': observed.index[0], 'freq': int(observed.iloc[0])}
+
+
+class Moments:
+    """Mergeable count, mean and sum of squared deviations (Welford / Chan)."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size:
+            other = Moments()
+            other.n = values.size
+            other.mean = values.mean()
+            other.m2 = ((values - other.mean) ** 2).sum()
+            self.merge(other)
+        return self
+
+    def merge(self, other):
+        n = self.n + other.n
+        if n == 0:
+            return self
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta ** 2 * self.n * other.n / n
+        self.n = n
+        return self
+
+    def remove(self, values):
+        """Inverse of update(): the moments of the data without `values`."""
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        n = self.n - values.size
+        if n <= 0:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return self
+        other_mean = values.mean()
+        mean = (self.n * self.mean - values.size * other_mean) / n
+        delta = other_mean - mean
+        self.m2 = max(self.m2 - ((values - other_mean) ** 2).sum()
+                      - delta ** 2 * n * values.size / self.n, 0.0)
+        self.mean, self.n = mean, n
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+
+class NumericSummary:
+
+    def __init__(self, compression=1000):
+        self.moments = Moments()
+        self.sketch = QuantileSketch(compression)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float)
+        self.moments.update(values)
+        self.sketch.update(values)
+        return self
+
+    def merge(self, other):
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
+        return self
+
+    def remove(self, values):
+        values = np.asarray(values, dtype=float)
+        self.moments.remove(values)
+        self.sketch.remove(values)
+        return self
+
+    def stats(self):
+        q = self.sketch.quantile(PERCENTILES) if self.moments.n else [np.nan] * 3
+        return {'count': float(self.moments.n),
+                'mean': self.moments.mean if self.moments.n else np.nan,
+                'std': self.moments.std,
+                'min': self.sketch.min if self.moments.n else np.nan,
+                '25%': q[0], '50%': q[1], '75%': q[2],
+                'max': self.sketch.max if self.moments.n else np.nan}
+
+
+def _is_categorical(series):
+    return not pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series)
+
+
+class SummaryEngine:
+    """Streaming replacement for the per-variable describe/concat loop."""
+
+    def __init__(self, variables, compression=1000):
+        self.variables = list(variables)
+        self.compression = compression
+        self.accumulators = {}
+
+    def update(self, chunk):
+        for var in self.variables:
+            acc = self.accumulators.get(var)
+            if acc is None:
+                if _is_categorical(chunk[var]):
+                    acc = CategoryCounts()
+                else:
+                    acc = NumericSummary(self.compression)
+                self.accumulators[var] = acc
+            acc.update(chunk[var])
+        return self
+
+    def remove(self, chunk):
+        """Take the rows of `chunk` (previously passed to update) out again."""
+        for var in self.variables:
+            if var in self.accumulators:
+                self.accumulators[var].remove(chunk[var])
+        return self
+
+    def merge(self, other):
+        for var, acc in other.accumulators.items():
+            if var in self.accumulators:
+                self.accumulators[var].merge(acc)
+            else:
+                # A copy: later merges into this engine must not change `other`
+                self.accumulators[var] = copy.deepcopy(acc)
+        return self
+
+    def table(self):
+        rows = [self.accumulators[var].stats() if var in self.accumulators else {}
+                for var in self.variables]
+        table = pd.DataFrame(rows, index=self.variables, columns=SUMMARY_COLUMNS, dtype=object)
+        # Drop the statistics no variable has, like describe() would
+        return table.dropna(axis=1, how='all')
+
+
+def summarize(data, variables, chunksize=None, compression=1000):
+    """Summary table for a DataFrame, or an iterable of DataFrame chunks."""
+    engine = SummaryEngine(variables, compression)
+    if isinstance(data, pd.DataFrame):
+        if chunksize:
+            for start in range(0, len(data), chunksize):
+                engine.update(data.iloc[start:start + chunksize])
+        else:
+            engine.update(data)
+    else:
+        for chunk in data:
+            engine.update(chunk)
+    return engine.table()
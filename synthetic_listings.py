@@ -0,0 +1,85 @@
+"""Synthetic listings with the AB_NYC_2019 schema, for benchmarks.
+
+The marginals roughly follow the real 2019 NYC data: borough and room type
+shares, 221 neighbourhoods with a skewed popularity, log-normal prices that
+depend on borough and room type, and heavily right-skewed review counts.
+
+    python synthetic_listings.py 1000000 listings_1m.csv
+"""
+
+import numpy as np
+import pandas as pd
+
+from listings_loader import ALL_COLUMNS, SCHEMA
+
+GROUPS = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island']
+GROUP_SHARE = [0.443, 0.411, 0.116, 0.022, 0.008]
+GROUP_HOODS = [32, 47, 51, 48, 43]
+GROUP_CENTRE = [(40.78, -73.97), (40.65, -73.95), (40.72, -73.82), (40.85, -73.88), (40.58, -74.15)]
+GROUP_PRICE = [1.25, 1.0, 0.85, 0.75, 0.8]
+
+ROOM_TYPES = ['Entire home/apt', 'Private room', 'Shared room']
+ROOM_SHARE = [0.520, 0.457, 0.023]
+ROOM_PRICE = [160.0, 75.0, 55.0]
+
+HOST_NAMES = ['Michael', 'David', 'John', 'Alex', 'Sarah', 'Maria', 'Daniel', 'Anna', 'Jessica', 'Sonder (NYC)']
+
+
+def make_listings(n, seed=0, start_id=2539):
+    """DataFrame of `n` synthetic listings with the loader's dtypes."""
+    rng = np.random.default_rng(seed)
+    group = rng.choice(len(GROUPS), n, p=GROUP_SHARE)
+    room = rng.choice(len(ROOM_TYPES), n, p=ROOM_SHARE)
+
+    # Zipf-like popularity of neighbourhoods within each borough
+    offsets = np.concatenate([[0], np.cumsum(GROUP_HOODS)])
+    hood = np.empty(n, dtype=np.int64)
+    for g, k in enumerate(GROUP_HOODS):
+        rows = np.flatnonzero(group == g)
+        weights = 1.0 / np.arange(1, k + 1)
+        hood[rows] = offsets[g] + rng.choice(k, rows.size, p=weights / weights.sum())
+    hood_names = [f'{GROUPS[g]} {i + 1:02d}' for g, k in enumerate(GROUP_HOODS) for i in range(k)]
+
+    centre = np.array(GROUP_CENTRE)[group]
+    scale = np.array(ROOM_PRICE)[room] * np.array(GROUP_PRICE)[group]
+    price = np.round(scale * rng.lognormal(0.0, 0.6, n)).astype(np.int32)
+    price[rng.random(n) < 0.0002] = 0
+    price = np.minimum(price, 10_000)
+    reviews = np.minimum(rng.negative_binomial(0.45, 0.019, n), 629).astype(np.int32)
+    reviewed = reviews > 0
+    days = rng.integers(0, 3000, n)
+
+    df = pd.DataFrame({
+        'id': np.arange(start_id, start_id + n, dtype=np.int64),
+        'name': pd.Series(rng.integers(0, 10**6, n)).map('Listing {}'.format).astype(object),
+        'host_id': rng.integers(2438, 274_000_000, n, dtype=np.int64),
+        'host_name': np.array(HOST_NAMES, dtype=object)[rng.integers(0, len(HOST_NAMES), n)],
+        'neighbourhood_group': pd.Categorical.from_codes(group, GROUPS),
+        'neighbourhood': pd.Categorical.from_codes(hood, hood_names),
+        'latitude': (centre[:, 0] + rng.normal(0, 0.03, n)).astype(np.float32),
+        'longitude': (centre[:, 1] + rng.normal(0, 0.03, n)).astype(np.float32),
+        'room_type': pd.Categorical.from_codes(room, ROOM_TYPES),
+        'price': price,
+        'minimum_nights': np.minimum(rng.geometric(0.25, n), 1250).astype(np.int32),
+        'number_of_reviews': reviews,
+        'last_review': pd.to_datetime('2019-07-08') - pd.to_timedelta(np.where(reviewed, days, 0), 'D'),
+        'reviews_per_month': np.where(reviewed, np.round(rng.gamma(1.0, 1.4, n), 2), np.nan).astype(np.float32),
+        'calculated_host_listings_count': np.minimum(rng.geometric(0.6, n), 327).astype(np.int32),
+        'availability_365': rng.integers(0, 366, n).astype(np.int16),
+    })
+    df.loc[~reviewed, 'last_review'] = pd.NaT
+    return df[ALL_COLUMNS].astype({c: t for c, t in SCHEMA.items() if t.lower().startswith('int')})
+
+
+def write_listings(path, n, seed=0, chunksize=500_000):
+    """Write `n` synthetic listings to CSV in chunks of `chunksize` rows."""
+    for i, start in enumerate(range(0, n, chunksize)):
+        chunk = make_listings(min(chunksize, n - start), seed=seed + i, start_id=2539 + start)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
+
+
+if __name__ == '__main__':
+    import sys
+
+    write_listings(sys.argv[2], int(sys.argv[1]))
@@ -0,0 +1,77 @@
+"""Streaming duplicate detection against df.duplicated()."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from duplicates import BloomDigestSet, SortedDigestSet, find_duplicates
+from synthetic_listings import make_listings
+
+
+@pytest.fixture(scope='module')
+def listings():
+    df = make_listings(4000)
+    # Exact copies of some rows, and some ids reused with other values
+    copies = df.sample(300, random_state=0)
+    reused = make_listings(200, seed=1).assign(id=df['id'].sample(200, random_state=1).to_numpy())
+    return pd.concat([df, copies, reused]).sample(frac=1, random_state=2).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('key', [None, ['id']])
+@pytest.mark.parametrize('chunksize', [None, 333])
+def test_detector_matches_duplicated(listings, key, chunksize):
+    detector = find_duplicates(listings, key=key, chunksize=chunksize)
+    expected = np.flatnonzero(listings.duplicated(subset=key))
+    np.testing.assert_array_equal(detector.indices(), expected)
+    assert detector.count == expected.size
+
+
+def test_locations_across_files(listings, tmp_path):
+    parts = np.array_split(np.arange(len(listings)), 3)
+    paths = []
+    for i, rows in enumerate(parts):
+        paths.append(str(tmp_path / f'part{i}.csv'))
+        listings.iloc[rows].to_csv(paths[-1], index=False)
+    detector = find_duplicates(paths, key=['id'], chunksize=500)
+    expected = np.flatnonzero(listings.duplicated(subset=['id']))
+    np.testing.assert_array_equal(detector.indices(), expected)
+    starts = np.array([rows[0] for rows in parts])
+    which = np.searchsorted(starts, expected, side='right') - 1
+    assert detector.locations()['source'].tolist() == [paths[i] for i in which]
+    np.testing.assert_array_equal(detector.locations()['row'], expected - starts[which])
+
+
+def test_bloom_never_misses_and_bounds_false_positives(listings):
+    exact = find_duplicates(listings, chunksize=500)
+    bloom = find_duplicates(listings, chunksize=500, bloom=True, capacity=len(listings), error_rate=0.01)
+    found, expected = set(bloom.indices()), set(exact.indices())
+    assert expected <= found
+    # Extra reports are new rows flagged as seen, at about error_rate of them
+    new_rows = len(listings) - len(expected)
+    assert len(found - expected) <= 3 * 0.01 * new_rows
+    assert bloom.nbytes < exact.nbytes
+
+
+def test_bloom_false_positive_rate():
+    rng = np.random.default_rng(0)
+    bloom = BloomDigestSet(10_000, error_rate=0.01)
+    bloom.add(rng.integers(0, 2**63, 10_000, dtype=np.uint64))
+    rate = bloom.contains(rng.integers(0, 2**63, 100_000, dtype=np.uint64)).mean()
+    assert 0 < rate < 0.02
+
+
+def test_sorted_digest_set_membership():
+    rng = np.random.default_rng(0)
+    digests = rng.permutation(np.arange(1, 20_001, dtype=np.uint64) * np.uint64(7919))
+    seen = SortedDigestSet()
+    for part in np.array_split(digests[:15_000], 40):
+        seen.add(part)
+    assert len(seen) == 15_000
+    assert len(seen.runs) <= np.log2(15_000) + 1
+    assert seen.contains(digests[:15_000]).all()
+    assert not seen.contains(digests[15_000:]).any()
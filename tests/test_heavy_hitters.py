@@ -0,0 +1,55 @@
+"""HeavyHitters bounds and TopK recall after merging shards."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from heavy_hitters import HeavyHitters, TopK
+from synthetic_listings import make_listings
+
+CAPACITY = 40
+
+
+@pytest.fixture(scope='module')
+def shards():
+    return [make_listings(5000, seed=i, start_id=2539 + 5000 * i) for i in range(4)]
+
+
+@pytest.fixture(scope='module')
+def exact(shards):
+    return pd.concat(shards)['neighbourhood'].astype(object).value_counts()
+
+
+def test_bounds_contain_exact_counts_after_merge(shards, exact):
+    merged = HeavyHitters(CAPACITY)
+    for shard in shards:
+        merged.merge(HeavyHitters(CAPACITY).update(shard['neighbourhood']))
+    assert not merged.space_saving.exact
+
+    bounds = merged.bounds()
+    truth = exact.reindex(bounds.index).to_numpy()
+    assert (bounds['lower'].to_numpy() <= truth).all()
+    assert (truth <= bounds['upper'].to_numpy()).all()
+    assert (merged.estimate(exact.index) >= exact.to_numpy()).all()
+
+    # Every label above total / capacity is guaranteed to be monitored
+    heavy = exact[exact > exact.sum() / CAPACITY].index
+    assert set(heavy) <= set(bounds.index)
+
+
+@pytest.mark.parametrize('where', [{}, {'neighbourhood_group': 'Brooklyn'}, {'room_type': 'Private room'}])
+def test_top_k_recall(shards, where, n=10):
+    sketched, counted = TopK(capacity=CAPACITY), TopK()
+    for shard in shards:
+        sketched.merge(TopK(capacity=CAPACITY).update(shard))
+        counted.update(shard)
+    expected = counted.top(n, **where)
+    got = sketched.top(n, **where)
+    recall = len(set(got.index) & set(expected.index)) / n
+    assert recall >= 0.9
+    assert np.array_equal(got.index[:3], expected.index[:3])
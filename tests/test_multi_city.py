@@ -0,0 +1,45 @@
+"""multi_city.run merges per-file results without changing them."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from multi_city import run
+from pipeline import SUMMARY_VARIABLES
+from summary_stats import SummaryEngine
+from synthetic_listings import write_listings
+
+SIZES = {'a.csv': 500, 'b.csv': 800, 'c.csv': 300}
+
+
+@pytest.fixture
+def cities(tmp_path):
+    paths = []
+    for i, (name, n) in enumerate(SIZES.items()):
+        path = str(tmp_path / name)
+        write_listings(path, n, seed=i)
+        paths.append(path)
+    return paths
+
+
+def test_merge_leaves_the_merged_engines_unchanged(cities):
+    engines = [SummaryEngine(SUMMARY_VARIABLES).update(pd.read_csv(p)) for p in cities]
+    before = [e.table() for e in engines]
+    merged = SummaryEngine(SUMMARY_VARIABLES)
+    for e in engines:
+        merged.merge(e)
+    for e, table in zip(engines, before):
+        pd.testing.assert_frame_equal(e.table(), table)
+    assert merged.table().loc['price', 'count'] == sum(SIZES.values())
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_file_summaries_keep_per_file_counts(cities, workers):
+    result = run(cities, workers)
+    counts = result['file_summaries'].xs('price', level='variable')['count']
+    assert {os.path.basename(p): c for p, c in counts.items()} == SIZES
+    assert result['summary'].loc['price', 'count'] == sum(SIZES.values())
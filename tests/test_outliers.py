@@ -0,0 +1,49 @@
+"""IQR fences and outlier masks against plain pandas quantiles."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from outliers import fences_from_sketches, find_outliers, iqr_fences
+from pipeline import BOXPLOT_GROUPS, OUTLIER_COLUMNS
+from quantile_sketch import QuantileSketch
+from synthetic_listings import make_listings
+
+
+@pytest.fixture(scope='module')
+def listings():
+    return make_listings(5000)
+
+
+def _pandas_mask(values, k=1.5):
+    q1, q3 = values.quantile(0.25), values.quantile(0.75)
+    return (values < q1 - k * (q3 - q1)) | (values > q3 + k * (q3 - q1))
+
+
+def test_fences_and_masks_match_pandas(listings):
+    outliers = find_outliers(listings, OUTLIER_COLUMNS)
+    for c in OUTLIER_COLUMNS:
+        q1, q3 = listings[c].quantile(0.25), listings[c].quantile(0.75)
+        assert outliers.fences.loc[c, ['q1', 'q3']].tolist() == [q1, q3]
+        assert outliers.fences.loc[c, 'upper'] == q3 + 1.5 * (q3 - q1)
+        expected = _pandas_mask(listings[c])
+        np.testing.assert_array_equal(outliers.mask(c), expected.to_numpy())
+        pd.testing.assert_frame_equal(outliers.rows(listings, c), listings[expected])
+    assert outliers.any().sum() == (_pandas_mask(listings['price']) | _pandas_mask(listings['number_of_reviews'])).sum()
+
+
+def test_grouped_masks_match_pandas(listings):
+    outliers = find_outliers(listings, ['price'], by=BOXPLOT_GROUPS)
+    expected = listings.groupby(BOXPLOT_GROUPS, observed=True)['price'].transform(_pandas_mask).astype(bool)
+    np.testing.assert_array_equal(outliers.mask('price'), expected.to_numpy())
+
+
+def test_fences_from_exact_sketches_match(listings):
+    sketches = {c: QuantileSketch(None).update(listings[c]) for c in OUTLIER_COLUMNS}
+    pd.testing.assert_frame_equal(fences_from_sketches(sketches), iqr_fences(listings, OUTLIER_COLUMNS),
+                                  check_dtype=False)
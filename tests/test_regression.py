@@ -0,0 +1,70 @@
+"""FixedEffectsOLS against fresh fits and a dense statsmodels OLS."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from regression import FixedEffectsOLS, fit_price_model
+from synthetic_listings import make_listings
+
+COLUMNS = ['neighbourhood_group', 'neighbourhood', 'room_type', 'number_of_reviews', 'price']
+SHARED = {'number_of_reviews': 'number_of_reviews',
+          'room_type[Private room]': 'C(room_type)[T.Private room]',
+          'room_type[Shared room]': 'C(room_type)[T.Shared room]'}
+
+
+def price_model():
+    return FixedEffectsOLS('price', numeric=['number_of_reviews'], categorical=['room_type'],
+                           absorb='neighbourhood')
+
+
+def assert_same_fit(a, b):
+    pd.testing.assert_series_equal(a.params, b.params, rtol=1e-10)
+    pd.testing.assert_series_equal(a.fixed_effects, b.fixed_effects, rtol=1e-10)
+    for kind in ('classical', 'HC1', 'cluster'):
+        pd.testing.assert_series_equal(a.bse(kind), b.bse(kind), rtol=1e-10)
+    assert (a.nobs, a.n_groups, a.df_resid) == (b.nobs, b.n_groups, b.df_resid)
+
+
+def test_refit_on_other_data_equals_fresh_fit():
+    first = make_listings(3000, seed=1)[COLUMNS]
+    other = make_listings(3000, seed=2)[COLUMNS]
+    # Fewer neighbourhoods than the first fit saw
+    other = other[other['neighbourhood_group'] == 'Brooklyn']
+
+    model = price_model()
+    model.fit(first)
+    refit = model.fit(other)
+
+    assert np.isfinite(refit.params).all()
+    assert refit.n_groups == other['neighbourhood'].nunique()
+    assert_same_fit(refit, price_model().fit(other))
+
+
+def test_chunked_fit_equals_single_frame():
+    df = make_listings(3000, seed=3)[COLUMNS]
+    chunked = price_model().fit(lambda: (df.iloc[i:i + 700] for i in range(0, len(df), 700)))
+    assert_same_fit(chunked, price_model().fit(df))
+
+
+def test_matches_dense_statsmodels_ols():
+    smf = pytest.importorskip('statsmodels.formula.api')
+    df = make_listings(5000, seed=4)[COLUMNS]
+    dense = df.astype({'neighbourhood': str, 'room_type': str, 'price': float,
+                       'number_of_reviews': float})
+    formula = 'price ~ C(neighbourhood) + C(room_type) + number_of_reviews'
+
+    fe = fit_price_model(df)
+    classical = smf.ols(formula, dense).fit()
+    hc1 = smf.ols(formula, dense).fit(cov_type='HC1')
+
+    ours, theirs = list(SHARED), list(SHARED.values())
+    np.testing.assert_allclose(fe.params[ours], classical.params[theirs], rtol=1e-7)
+    np.testing.assert_allclose(fe.bse('classical')[ours], classical.bse[theirs], rtol=1e-7)
+    np.testing.assert_allclose(fe.bse('HC1')[ours], hc1.bse[theirs], rtol=1e-7)
+    assert fe.df_resid == classical.df_resid
@@ -0,0 +1,72 @@
+"""Applying a snapshot diff gives the same tables as rebuilding from scratch."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from listings_loader import save_versioned
+from pipeline import tables_equal
+from snapshots import (SNAPSHOT_COLUMNS, STATE_VERSION, ReportState, default_state_path,
+                       diff_snapshots, ingest)
+from synthetic_listings import make_listings
+from vocabulary import load_encoded
+
+
+def _change(old, kind):
+    new = old.copy()
+    if kind in ('update', 'all'):
+        rows = new.index[::7]
+        new.loc[rows, 'price'] = new.loc[rows, 'price'] + 25
+        new.loc[new.index[::11], 'room_type'] = 'Shared room'
+    if kind in ('remove', 'all'):
+        new = new.drop(new.index[::5])
+    if kind in ('insert', 'all'):
+        new = pd.concat([new, make_listings(300, seed=1, start_id=10**7)], ignore_index=True)
+    return new
+
+
+@pytest.fixture
+def snapshots(tmp_path, request):
+    old = make_listings(2000, seed=0)
+    paths = [str(tmp_path / 'old.csv'), str(tmp_path / 'new.csv')]
+    old.to_csv(paths[0], index=False)
+    _change(old, request.param).to_csv(paths[1], index=False)
+    return paths
+
+
+@pytest.mark.parametrize('snapshots', ['insert', 'update', 'remove', 'all'], indirect=True)
+def test_apply_matches_build(snapshots):
+    old, new = (load_encoded(p, columns=SNAPSHOT_COLUMNS) for p in snapshots)
+    diff = diff_snapshots(old, new)
+    assert len(diff)
+    applied = ReportState.build(old).apply(diff, new).tables()
+    assert tables_equal(applied, ReportState.build(new).tables()) == []
+
+
+@pytest.mark.parametrize('snapshots', ['all'], indirect=True)
+def test_ingest_rebuilds_an_approximate_state(snapshots, tmp_path):
+    old_path, new_path = snapshots
+    state = ReportState.build(load_encoded(old_path, columns=SNAPSHOT_COLUMNS), compression=20)
+    assert not state.sketches()['price'].exact
+    save_versioned(state, default_state_path(new_path, 'nyc'), STATE_VERSION)
+
+    result = ingest(new_path, out_dir=str(tmp_path / 'report'), figures=False, series='nyc')
+    assert result['rebuilt']
+    new = load_encoded(new_path, columns=SNAPSHOT_COLUMNS)
+    rebuilt = ReportState.build(new).tables()
+    written = pd.read_csv(tmp_path / 'report' / 'outlier_fences.csv', index_col=0)
+    pd.testing.assert_frame_equal(written, rebuilt['outlier_fences'], check_dtype=False,
+                                  check_names=False, check_index_type=False)
+
+
+def test_diff_rejects_duplicate_ids():
+    old = make_listings(50)
+    new = pd.concat([old, old.iloc[:1]], ignore_index=True)
+    with pytest.raises(ValueError, match='duplicate'):
+        diff_snapshots(old, new)
+    with pytest.raises(ValueError, match='duplicate'):
+        diff_snapshots(new, old)
@@ -0,0 +1,64 @@
+"""SummaryEngine against describe(), and its mergeable accumulators."""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline import SUMMARY_VARIABLES
+from quantile_sketch import QuantileSketch
+from summary_stats import Moments, summarize
+from synthetic_listings import make_listings
+
+
+@pytest.fixture(scope='module')
+def listings():
+    return make_listings(5000)
+
+
+@pytest.mark.parametrize('chunksize', [None, 700])
+def test_summary_matches_describe(listings, chunksize):
+    table = summarize(listings, SUMMARY_VARIABLES, chunksize)
+    for var in SUMMARY_VARIABLES:
+        expected = listings[var].describe(include='all')
+        got = table.loc[var, expected.index]
+        if pd.api.types.is_numeric_dtype(listings[var]):
+            np.testing.assert_allclose(got.to_numpy(dtype=float), expected.to_numpy(dtype=float), rtol=1e-12)
+        else:
+            assert got.tolist() == expected.tolist()
+
+
+def test_moments_merge_matches_one_pass():
+    rng = np.random.default_rng(0)
+    parts = [rng.lognormal(4, 1, n) for n in (1, 250, 3000)]
+    merged = Moments()
+    for part in parts:
+        merged.merge(Moments().update(part))
+    values = np.concatenate(parts)
+    assert merged.n == values.size
+    np.testing.assert_allclose([merged.mean, merged.std], [values.mean(), values.std(ddof=1)], rtol=1e-12)
+
+    merged.remove(parts[2])
+    rest = np.concatenate(parts[:2])
+    np.testing.assert_allclose([merged.mean, merged.std], [rest.mean(), rest.std(ddof=1)], rtol=1e-9)
+
+
+def test_exact_sketch_matches_pandas_quantiles():
+    values = make_listings(5000)['price']
+    q = [0.0, 0.1, 0.25, 0.5, 0.75, 0.95, 1.0]
+    halves = QuantileSketch(None).update(values[:2000]).merge(QuantileSketch(None).update(values[2000:]))
+    assert halves.exact
+    np.testing.assert_array_equal(halves.quantile(q), values.quantile(q).to_numpy())
+
+
+def test_compressed_sketch_stays_within_its_rank_error():
+    values = np.random.default_rng(1).lognormal(4, 1, 50_000)
+    sketch = QuantileSketch(200).update(values)
+    assert not sketch.exact
+    q = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+    ranks = np.searchsorted(np.sort(values), sketch.quantile(q)) / values.size
+    assert np.abs(ranks - q).max() <= np.pi / (2 * 200)
@@ -0,0 +1,178 @@
+"""Persistent dictionary encoding for the string columns of the listings.
+
+A Codebook assigns every distinct label of a column an integer code in order
+of first appearance and never renumbers, so the same neighbourhood or room
+type has the same code in every snapshot and city encoded with the same
+Vocabulary. encode_frame() turns the columns into pandas categoricals whose
+categories are the codebook labels, so `.cat.codes` are those stable codes
+and filters and group-bys run on int arrays instead of comparing Python
+strings.
+
+The vocabulary is saved as JSON (by default .cache/vocabulary.json next to the
+data) and only grows; labels absent from a frame are unused categories, which
+drop_unused_labels() removes from a frame meant for plotting.
+
+    vocab = Vocabulary.load()
+    df = encode_frame(load_listings('AB_NYC_2019.csv'), vocab)
+    vocab.save()
+    private = df['room_type'].cat.codes == vocab['room_type'].code('Private room')
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from listings_loader import CACHE_DIR, load_listings
+
+# `name` is nearly unique per listing: its codebook would grow with every
+# snapshot and city for little gain. Pass it in `columns` explicitly if wanted.
+ENCODED_COLUMNS = ['host_name', 'neighbourhood_group', 'neighbourhood', 'room_type']
+
+# Bump when the saved layout changes
+VOCAB_VERSION = 1
+
+
+class Codebook:
+    """Append-only label <-> int32 code mapping for one column."""
+
+    def __init__(self, labels=()):
+        self.index = pd.Index(list(labels), dtype=object)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def labels(self):
+        return self.index.tolist()
+
+    def _grow(self, labels):
+        """Codes of `labels` (distinct, non-null), adding the unseen ones."""
+        codes = self.index.get_indexer(labels)
+        new = codes < 0
+        if new.any():
+            self.index = self.index.append(pd.Index(labels[new], dtype=object))
+            codes[new] = np.arange(len(self.index) - new.sum(), len(self.index))
+        return codes
+
+    def encode(self, values):
+        """int32 code per value (-1 for missing), adding unseen labels.
+
+        A categorical is translated through its (few) categories, so only
+        distinct labels are ever compared as strings.
+        """
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            local, labels = values.cat.codes.to_numpy(), values.cat.categories
+        else:
+            local, labels = pd.factorize(values, use_na_sentinel=True)
+        lut = np.append(self._grow(np.asarray(labels, dtype=object)), -1).astype(np.int32)
+        return lut[local]
+
+    def code(self, label):
+        code = self.index.get_indexer([label])[0]
+        if code < 0:
+            raise KeyError(f'{label!r} is not in the codebook')
+        return int(code)
+
+    def decode(self, codes):
+        codes = np.asarray(codes)
+        labels = np.append(self.index.to_numpy(dtype=object), np.nan)
+        return labels[np.where(codes < 0, len(self), codes)]
+
+    def categorical(self, codes):
+        return pd.Categorical.from_codes(codes, categories=self.index)
+
+    def recode(self, codes, labels):
+        """Position of each code's label in `labels`, -1 where it is not listed.
+
+        Maps stable codes onto a caller's own ordering, e.g. the room types
+        in plotting order, with one array lookup.
+        """
+        lut = np.full(len(self) + 1, -1, dtype=np.int32)
+        known = self.index.get_indexer(list(labels))
+        lut[known[known >= 0]] = np.flatnonzero(known >= 0)
+        codes = np.asarray(codes)
+        return lut[np.where(codes < 0, len(self), codes)]
+
+
+class Vocabulary:
+    """Codebooks for several columns, saved together as JSON."""
+
+    def __init__(self, codebooks=None, path=None):
+        self.codebooks = dict(codebooks or {})
+        self.path = path
+
+    def __getitem__(self, column):
+        return self.codebooks.setdefault(column, Codebook())
+
+    def __contains__(self, column):
+        return column in self.codebooks
+
+    def sizes(self):
+        return {c: len(b) for c, b in self.codebooks.items()}
+
+    @staticmethod
+    def default_path(data_path='AB_NYC_2019.csv'):
+        return os.path.join(os.path.dirname(os.path.abspath(data_path)), CACHE_DIR, 'vocabulary.json')
+
+    @classmethod
+    def load(cls, path=None):
+        """The saved vocabulary at `path`, or an empty one if there is none yet."""
+        path = path or cls.default_path()
+        if not os.path.exists(path):
+            return cls(path=path)
+        with open(path, encoding='utf-8') as f:
+            saved = json.load(f)
+        if saved.get('version') != VOCAB_VERSION:
+            raise ValueError(f'{path} holds vocabulary version {saved.get("version")}, expected {VOCAB_VERSION}')
+        return cls({c: Codebook(labels) for c, labels in saved['columns'].items()}, path)
+
+    def save(self, path=None):
+        path = path or self.path or self.default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': VOCAB_VERSION,
+                       'columns': {c: b.labels for c, b in self.codebooks.items()}}, f)
+        os.replace(tmp, path)
+        self.path = path
+
+
+def encode_frame(df, vocabulary, columns=ENCODED_COLUMNS):
+    """Copy of `df` with `columns` as categoricals on the stable vocabulary codes."""
+    out = df.copy()
+    for c in columns:
+        if c in out.columns:
+            book = vocabulary[c]
+            out[c] = book.categorical(book.encode(out[c]))
+    return out
+
+
+def drop_unused_labels(df, columns=ENCODED_COLUMNS):
+    """Copy of `df` whose encoded columns only list the labels that occur.
+
+    For display: seaborn draws a slot for every category, including labels
+    that only other snapshots or cities have. The codes of the copy are no
+    longer the vocabulary codes.
+    """
+    out = df.copy()
+    for c in columns:
+        if c in out.columns:
+            out[c] = out[c].cat.remove_unused_categories()
+    return out
+
+
+def load_encoded(path='AB_NYC_2019.csv', columns=None, vocabulary=None, **kwargs):
+    """load_listings() followed by encode_frame(); saves the vocabulary if it grew.
+
+    vocabulary -- a Vocabulary shared across snapshots/cities (default: the
+                  one saved next to `path`)
+    """
+    vocabulary = vocabulary or Vocabulary.load(Vocabulary.default_path(path))
+    before = vocabulary.sizes()
+    df = encode_frame(load_listings(path, columns=columns, **kwargs), vocabulary)
+    if vocabulary.sizes() != before:
+        vocabulary.save()
+    return df
+